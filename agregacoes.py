@@ -0,0 +1,356 @@
+"""Estruturas pré-calculadas sobre a planilha, montadas uma vez por versão"""
+import numpy as np
+import pandas as pd
+
+# Papéis (ver esquema.resolver_colunas) usados como filtros do dashboard
+DIMENSOES = ('ano', 'campanha', 'meio', 'veiculo')
+
+
+def assinatura_linhas(df):
+    """Hash (uint64) de cada linha, para comparar versões da planilha"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def linhas_acrescentadas(assinatura_anterior, assinatura):
+    """Posição da primeira linha nova quando a versão só acrescentou linhas ao fim da anterior.
+
+    Retorna None se alguma linha anterior foi editada, removida ou mudou de
+    lugar (os derivados precisam ser recalculados do zero).
+    """
+    inicio = len(assinatura_anterior)
+    if len(assinatura) < inicio or not np.array_equal(assinatura[:inicio], assinatura_anterior):
+        return None
+    return inicio
+
+
+def _menor_inteiro(codigos, total):
+    """Códigos no menor tipo inteiro que comporta ``total`` valores (e o -1 de vazio)"""
+    for tipo in (np.int8, np.int16, np.int32):
+        if total < np.iinfo(tipo).max:
+            return codigos.astype(tipo, copy=False)
+    return codigos
+
+
+class _Dimensao:
+    """Uma coluna de filtro codificada como categoria, com a lista de linhas de cada valor"""
+    __slots__ = ('valores', 'codigo_de', 'codigos', 'linhas', 'inicios')
+
+    def __init__(self, serie, ordenar):
+        codigos, valores = pd.factorize(serie, sort=ordenar)
+        self._indexar(list(valores), codigos)
+
+    def _indexar(self, valores, codigos):
+        self.valores = valores
+        self.codigo_de = {valor: codigo for codigo, valor in enumerate(valores)}
+        self.codigos = _menor_inteiro(codigos, len(valores))
+
+        # Linhas de cada valor em ordem crescente ("posting lists" num único vetor):
+        # as do código c ficam em linhas[inicios[c]:inicios[c + 1]]
+        ordem = np.argsort(self.codigos, kind='stable')
+        vazios = int((codigos < 0).sum())
+        self.linhas = ordem[vazios:]
+        contagens = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+        self.inicios = np.concatenate(([0], np.cumsum(contagens)))
+
+    def estendida(self, serie_nova, ordenar):
+        """Nova dimensão com as linhas de ``serie_nova`` acrescentadas ao fim.
+
+        Só as linhas novas são codificadas; valores novos ganham os próximos
+        códigos (ou, com ``ordenar``, os valores são reordenados). Retorna a
+        dimensão e o vetor com o novo código de cada código antigo.
+        """
+        codigos_novos, valores_novos = pd.factorize(serie_nova)
+        valores = self.valores + [valor for valor in valores_novos if valor not in self.codigo_de]
+        codigo_de = {valor: codigo for codigo, valor in enumerate(valores)}
+        # O -1 no fim traduz os vazios (código -1) para -1
+        traducao = np.array([codigo_de[valor] for valor in valores_novos] + [-1], dtype=np.int64)
+        codigos = np.concatenate((self.codigos.astype(np.int64), traducao[codigos_novos]))
+
+        posicao = np.arange(len(valores))
+        if ordenar and len(valores) > len(self.valores):
+            ordem = sorted(range(len(valores)), key=valores.__getitem__)
+            posicao[ordem] = np.arange(len(valores))
+            codigos = np.where(codigos >= 0, posicao[codigos], -1)
+            valores = [valores[i] for i in ordem]
+
+        nova = _Dimensao.__new__(_Dimensao)
+        nova._indexar(valores, codigos)
+        return nova, posicao[:len(self.valores)]
+
+    def linhas_do_codigo(self, codigo):
+        return self.linhas[self.inicios[codigo]:self.inicios[codigo + 1]]
+
+
+class IndiceFiltros:
+    """Índice das colunas de filtro do dashboard (Ano, Campanha, Meio, Veículo).
+
+    Cada coluna é codificada uma única vez (o ano já como texto, em ordem) e
+    guarda as linhas de cada valor. Aplicar os filtros parte da lista de
+    linhas do valor mais raro e confere os códigos das demais colunas só
+    nessas linhas, sem comparar a planilha inteira nem copiá-la. Deve ser
+    guardado com ``DatasetStore.derivado``.
+    """
+
+    def __init__(self, df, papeis):
+        self.total_linhas = len(df)
+        self._colunas = {nome: papeis[nome] for nome in DIMENSOES if papeis.get(nome) is not None}
+        self._dimensoes = {
+            nome: _Dimensao(self._serie(df, nome), ordenar=nome == 'ano')
+            for nome in self._colunas
+        }
+
+    def _serie(self, df, nome, inicio=0):
+        serie = df[self._colunas[nome]].iloc[inicio:]
+        # O filtro de ano sempre comparou o texto do valor
+        return serie.astype(str) if nome == 'ano' else serie
+
+    def estendido(self, df, inicio):
+        """Índice de ``df``, que repete as linhas da versão indexada e acrescenta as de ``inicio`` em diante.
+
+        Só as linhas novas são codificadas. Retorna o novo índice e, por
+        dimensão, o vetor com o novo código de cada código antigo (para o
+        ``CuboKPIs.estendido``).
+        """
+        novo = IndiceFiltros.__new__(IndiceFiltros)
+        novo.total_linhas = len(df)
+        novo._colunas = self._colunas
+        novo._dimensoes = {}
+        remapeamentos = {}
+        for nome, dimensao in self._dimensoes.items():
+            novo._dimensoes[nome], remapeamentos[nome] = dimensao.estendida(
+                self._serie(df, nome, inicio), ordenar=nome == 'ano'
+            )
+        return novo, remapeamentos
+
+    def __contains__(self, nome):
+        return nome in self._dimensoes
+
+    def opcoes(self, nome):
+        """Valores distintos da dimensão (vazio se a coluna não existe)"""
+        dimensao = self._dimensoes.get(nome)
+        return list(dimensao.valores) if dimensao else []
+
+    def dimensoes(self):
+        """Nomes das dimensões presentes na planilha"""
+        return list(self._dimensoes)
+
+    def codigos(self, nome):
+        """Código de cada linha na dimensão (-1 para vazio)"""
+        return self._dimensoes[nome].codigos
+
+    def codigo(self, nome, valor):
+        """Código do valor na dimensão, ou None se ele não aparece na planilha"""
+        return self._dimensoes[nome].codigo_de.get(valor)
+
+    def filtrar(self, selecoes):
+        """Posições (crescentes) das linhas que atendem a ``{dimensao: valor}``.
+
+        Seleções com valor None ou de dimensões inexistentes são ignoradas;
+        sem nenhum filtro ativo retorna None (todas as linhas).
+        """
+        ativos = []
+        for nome, valor in selecoes.items():
+            dimensao = self._dimensoes.get(nome)
+            if dimensao is None or valor is None:
+                continue
+            codigo = dimensao.codigo_de.get(valor)
+            if codigo is None:
+                return np.empty(0, dtype=np.intp)
+            ativos.append((dimensao, codigo))
+
+        if not ativos:
+            return None
+
+        ativos.sort(key=lambda item: item[0].inicios[item[1] + 1] - item[0].inicios[item[1]])
+        dimensao, codigo = ativos[0]
+        posicoes = dimensao.linhas_do_codigo(codigo)
+        for dimensao, codigo in ativos[1:]:
+            posicoes = posicoes[dimensao.codigos[posicoes] == codigo]
+        return posicoes
+
+
+class CuboKPIs:
+    """Somas de impacto, investimento e leads por combinação de Ano, Campanha, Meio e Veículo.
+
+    Montado uma vez por versão a partir dos códigos do ``IndiceFiltros``: cada
+    célula é uma combinação presente na planilha. Os Big Numbers de qualquer
+    filtro somam só as células que atendem à seleção, então o custo depende
+    do número de combinações e não do número de linhas. Valores vazios contam
+    como zero, como no ``sum`` do pandas.
+    """
+
+    METRICAS = ('impacto', 'investimento', 'leads')
+
+    def __init__(self, df, papeis, indice):
+        self._indice = indice
+        codigos = {nome: indice.codigos(nome) for nome in indice.dimensoes()}
+        valores = {metrica: self._valores(df, papeis.get(metrica)) for metrica in self.METRICAS}
+        self._agregar(codigos, np.ones(len(df), dtype=np.int64), valores)
+
+    @staticmethod
+    def _valores(df, coluna):
+        if coluna is None:
+            return None
+        return np.nan_to_num(pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=float))
+
+    def _agregar(self, codigos, linhas, valores):
+        """Soma ``linhas`` e ``valores`` por combinação dos ``codigos`` de cada dimensão.
+
+        Os vetores podem ser de linhas da planilha ou de células já somadas
+        (na extensão do cubo).
+        """
+        total = len(linhas)
+        if codigos:
+            # Códigos deslocados em +1 para que o vazio (-1) vire uma célula própria
+            nomes = list(codigos)
+            deslocados = [codigos[nome].astype(np.int64) + 1 for nome in nomes]
+            tamanhos = [len(self._indice.opcoes(nome)) + 1 for nome in nomes]
+            chave = np.ravel_multi_index(deslocados, tamanhos)
+            celulas, celula_da_linha = np.unique(chave, return_inverse=True)
+            self._celulas = {
+                nome: (codigos_celula - 1)
+                for nome, codigos_celula in zip(nomes, np.unravel_index(celulas, tamanhos))
+            }
+        else:
+            celula_da_linha = np.zeros(total, dtype=np.intp)
+            celulas = np.zeros(min(total, 1), dtype=np.int64)
+            self._celulas = {}
+        self.total_celulas = len(celulas)
+
+        self._linhas = np.bincount(celula_da_linha, weights=linhas, minlength=len(celulas)).astype(np.int64)
+        self._somas = {
+            metrica: None if v is None else np.bincount(celula_da_linha, weights=v, minlength=len(celulas))
+            for metrica, v in valores.items()
+        }
+
+    def estendido(self, df, papeis, indice, inicio, remapeamentos):
+        """Cubo de ``df`` a partir deste, agregando só as linhas de ``inicio`` em diante.
+
+        ``indice`` e ``remapeamentos`` vêm de ``IndiceFiltros.estendido``: as
+        células atuais são traduzidas para os novos códigos e somadas junto
+        com as linhas novas.
+        """
+        novo = CuboKPIs.__new__(CuboKPIs)
+        novo._indice = indice
+        codigos = {}
+        for nome, codigos_celula in self._celulas.items():
+            traduzidos = np.where(codigos_celula >= 0, remapeamentos[nome][np.maximum(codigos_celula, 0)], -1)
+            codigos[nome] = np.concatenate((traduzidos, indice.codigos(nome)[inicio:]))
+        novas = df.iloc[inicio:]
+        linhas = np.concatenate((self._linhas, np.ones(len(novas), dtype=np.int64)))
+        valores = {
+            metrica: None if somas is None else np.concatenate((somas, self._valores(novas, papeis.get(metrica))))
+            for metrica, somas in self._somas.items()
+        }
+        novo._agregar(codigos, linhas, valores)
+        return novo
+
+    def _mascara(self, selecoes):
+        mascara = np.ones(self.total_celulas, dtype=bool)
+        for nome, valor in selecoes.items():
+            if valor is None or nome not in self._celulas:
+                continue
+            codigo = self._indice.codigo(nome, valor)
+            if codigo is None:
+                return np.zeros(self.total_celulas, dtype=bool)
+            mascara &= self._celulas[nome] == codigo
+        return mascara
+
+    def totais(self, selecoes):
+        """Impacto, investimento e leads somados para ``{dimensao: valor}`` (None = todos).
+
+        Inclui ``registros`` (linhas da planilha na seleção). Métricas sem
+        coluna na planilha ficam com 0.
+        """
+        mascara = self._mascara(selecoes)
+        totais = {
+            metrica: float(somas[mascara].sum()) if somas is not None else 0
+            for metrica, somas in self._somas.items()
+        }
+        totais['registros'] = int(self._linhas[mascara].sum())
+        return totais
+
+    def por(self, nome, selecoes):
+        """Totais por valor da dimensão ``nome`` dentro da seleção, com CPM e CPL.
+
+        Retorna um DataFrame indexado pelos valores da dimensão (só os que têm
+        linhas na seleção), com as colunas ``registros``, ``impacto``,
+        ``investimento``, ``leads``, ``cpm`` e ``cpl``.
+        """
+        if nome not in self._celulas:
+            return pd.DataFrame(columns=['registros', *self.METRICAS, 'cpm', 'cpl'])
+
+        mascara = self._mascara(selecoes) & (self._celulas[nome] >= 0)
+        codigos = self._celulas[nome][mascara]
+        total_valores = len(self._indice.opcoes(nome))
+
+        dados = {'registros': np.bincount(codigos, weights=self._linhas[mascara], minlength=total_valores)}
+        for metrica, somas in self._somas.items():
+            dados[metrica] = (
+                np.bincount(codigos, weights=somas[mascara], minlength=total_valores)
+                if somas is not None else np.zeros(total_valores)
+            )
+
+        resultado = pd.DataFrame(dados, index=pd.Index(self._indice.opcoes(nome), name=nome))
+        resultado['registros'] = resultado['registros'].astype(np.int64)
+        resultado = resultado[resultado['registros'] > 0]
+        # Mesmas fórmulas dos cards: CPM = investimento / impacto * 1000, CPL = investimento / leads
+        resultado['cpm'] = (resultado['investimento'] / resultado['impacto'] * 1000).where(resultado['impacto'] > 0, 0.0)
+        resultado['cpl'] = (resultado['investimento'] / resultado['leads']).where(resultado['leads'] > 0, 0.0)
+        return resultado
+
+
+class SeriesTemporais:
+    """Somas de cada métrica por mês, trimestre, semestre e ano.
+
+    As somas mensais são feitas num único ``groupby`` sobre todas as métricas;
+    trimestres, semestres e anos são agregados a partir delas. Os períodos
+    ficam como ``Period`` (ordenáveis) no índice de cada tabela, então trocar
+    o agrupamento ou a métrica na Análise Temporal é só uma consulta. Deve
+    ser guardado por versão da planilha e coluna de data.
+    """
+
+    GRANULARIDADES = ('Mês', 'Trimestre', 'Semestre', 'Ano')
+
+    def __init__(self, datas, df, metricas):
+        self.metricas = list(metricas)
+        self.mensal = self._somas_mensais(datas, df)
+        self._montar()
+
+    def _somas_mensais(self, datas, df):
+        validas = datas.notna().to_numpy()
+        meses = pd.PeriodIndex(datas[validas], freq='M')
+        return df.loc[validas, self.metricas].groupby(meses).sum()
+
+    def estendida(self, datas_novas, df_novas):
+        """Séries com as linhas novas (e suas datas) somadas aos meses já calculados"""
+        nova = SeriesTemporais.__new__(SeriesTemporais)
+        nova.metricas = self.metricas
+        mensal_novo = self._somas_mensais(datas_novas, df_novas)
+        nova.mensal = pd.concat((self.mensal, mensal_novo)).groupby(level=0).sum()
+        nova._montar()
+        return nova
+
+    def _montar(self):
+        meses = self.mensal.index
+        # Semestres como períodos de 6 meses começando em janeiro ou julho
+        # (o ordinal mensal conta os meses desde janeiro de 1970)
+        semestres = pd.PeriodIndex.from_ordinals(meses.asi8 - meses.asi8 % 6, freq='6M')
+        self._tabelas = {
+            'Mês': self.mensal,
+            'Trimestre': self.mensal.groupby(meses.asfreq('Q')).sum(),
+            'Semestre': self.mensal.groupby(semestres).sum(),
+            'Ano': self.mensal.groupby(meses.asfreq('Y')).sum(),
+        }
+
+    @staticmethod
+    def rotulo(periodo):
+        """'2024-01', '2024Q1', '2024-S1' ou '2024'"""
+        if periodo.freqstr == '6M':
+            return f"{periodo.year}-S{1 if periodo.month <= 6 else 2}"
+        return str(periodo)
+
+    def tabela(self, granularidade, metrica):
+        """Colunas ``periodo`` (rótulo) e ``metrica``, indexadas pelo ``Period`` em ordem cronológica"""
+        serie = self._tabelas[granularidade][metrica]
+        return pd.DataFrame({'periodo': serie.index.map(self.rotulo), metrica: serie})
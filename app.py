@@ -1,595 +1,814 @@
-import streamlit as st
-import pandas as pd
-import io
-import msal
-import requests
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-from fpdf import FPDF
-import tempfile
-import os
-
-# ========== FUNÇÃO PARA FORMATAR PERCENTUAIS ==========
-def formatar_percentual(valor):
-    """Formata qualquer valor como percentual arredondado"""
-    if pd.isna(valor) or valor == 0:
-        return "0%"
-    # Converte para percentual (0.15 → 15)
-    percentual = valor * 100
-    # Arredonda para inteiro
-    return f"{round(percentual)}%"
-
-# ========== CORES OFICIAIS DA COCRED ==========
-CORES = {
-    'turquesa': '#00AE9D',
-    'verde_claro': '#C9D200',
-    'verde_escuro': '#003641',
-    'roxo': '#49479D',
-    'background': '#F5F7FA',
-    'texto_escuro': '#2C3E50',
-    'texto_claro': '#FFFFFF',
-    'cinza_claro': '#E8ECF1',
-    'branco': '#FFFFFF',
-    'cinza_medio': '#CCCCCC',
-    'cinza_escuro': '#666666',
-    'sucesso': '#28A745',
-    'erro': '#DC3545',
-    'alerta': '#FFC107'
-}
-
-# Configuração do tema Plotly com as cores da Cocred
-PLOTLY_TEMA = {
-    'layout': {
-        'font': {'color': CORES['texto_escuro']},
-        'title': {'font': {'color': CORES['verde_escuro'], 'size': 18}},
-        'xaxis': {'gridcolor': CORES['cinza_claro'], 'linecolor': CORES['cinza_claro']},
-        'yaxis': {'gridcolor': CORES['cinza_claro'], 'linecolor': CORES['cinza_claro']},
-        'plot_bgcolor': 'white',
-        'paper_bgcolor': 'white',
-        'colorway': [CORES['turquesa'], CORES['roxo'], CORES['verde_claro'], CORES['verde_escuro']]
-    }
-}
-
-# ========== CONFIGURAÇÕES DO AZURE ==========
-TENANT_ID = st.secrets["TENANT_ID"]
-CLIENT_ID = st.secrets["CLIENT_ID"]
-CLIENT_SECRET = st.secrets["CLIENT_SECRET"]
-DRIVE_ID = st.secrets["DRIVE_ID"]
-ITEM_ID = st.secrets["ITEM_ID"]
-
-# Link direto para o Excel Online
-EXCEL_ONLINE_URL = "https://agenciaideatore-my.sharepoint.com/:x:/r/personal/cristini_cordesco_ideatoreamericas_com/_layouts/15/Doc.aspx?sourcedoc=%7B198c1ffa-cc36-4faa-a79f-f041003b786a%7D&action=default"
-# ========================================
-
-# ========== CONFIGURAÇÃO DA PÁGINA ==========
-st.set_page_config(
-    page_title="Dashboard Cocred - Campanhas",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# CSS personalizado
-st.markdown(f"""
-<style>
-    h1, h2, h3 {{ color: {CORES['verde_escuro']} !important; }}
-    .stMetric {{ background-color: {CORES['branco']}; padding: 15px; border-radius: 10px; border-left: 5px solid {CORES['turquesa']}; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-    .stButton button {{ background-color: {CORES['turquesa']}; color: white; border: none; border-radius: 5px; padding: 10px 20px; font-weight: bold; transition: all 0.3s; }}
-    .stButton button:hover {{ background-color: {CORES['roxo']}; }}
-    .stLinkButton button {{ background: linear-gradient(135deg, {CORES['turquesa']}, {CORES['roxo']}); color: white; font-size: 18px; padding: 15px; border-radius: 10px; border: none; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-    .footer {{ color: {CORES['cinza_escuro']}; font-size: 12px; text-align: center; padding: 20px; border-top: 1px solid {CORES['cinza_claro']}; }}
-    .tooltip {{ position: relative; display: inline-block; cursor: help; }}
-    .tooltip .tooltiptext {{ visibility: hidden; width: 200px; background-color: {CORES['verde_escuro']}; color: white; text-align: center; border-radius: 6px; padding: 5px; position: absolute; z-index: 1; bottom: 125%; left: 50%; margin-left: -100px; opacity: 0; transition: opacity 0.3s; }}
-    .tooltip:hover .tooltiptext {{ visibility: visible; opacity: 1; }}
-</style>
-""", unsafe_allow_html=True)
-
-# ========== TÍTULO PRINCIPAL ==========
-st.markdown(f"""
-<div style='text-align: center; padding: 20px; background: linear-gradient(135deg, {CORES['turquesa']}20, {CORES['roxo']}20); border-radius: 15px; margin-bottom: 20px;'>
-    <h1 style='color: {CORES['verde_escuro']}; margin-bottom: 0;'>📊 Dashboard Cocred - Campanhas</h1>
-    <p style='color: {CORES['texto_escuro']};'>Análise consolidada de campanhas</p>
-</div>
-""", unsafe_allow_html=True)
-
-# ========== FUNÇÕES DE AUTENTICAÇÃO ==========
-@st.cache_resource
-def get_msal_app():
-    authority = f"https://login.microsoftonline.com/{TENANT_ID}"
-    return msal.ConfidentialClientApplication(
-        client_id=CLIENT_ID,
-        client_credential=CLIENT_SECRET,
-        authority=authority
-    )
-
-def get_access_token():
-    app = get_msal_app()
-    scopes = ["https://graph.microsoft.com/.default"]
-    result = app.acquire_token_for_client(scopes=scopes)
-    
-    if "access_token" in result:
-        return result["access_token"]
-    else:
-        st.error(f"Erro de autenticação: {result.get('error_description', 'Erro desconhecido')}")
-        return None
-
-def download_excel(token):
-    headers = {'Authorization': f'Bearer {token}'}
-    url = f"https://graph.microsoft.com/v1.0/drives/{DRIVE_ID}/items/{ITEM_ID}/content"
-    
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return io.BytesIO(response.content)
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro ao baixar: {str(e)}")
-        return None
-
-def get_file_metadata(token):
-    headers = {'Authorization': f'Bearer {token}'}
-    url = f"https://graph.microsoft.com/v1.0/drives/{DRIVE_ID}/items/{ITEM_ID}"
-    
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except:
-        return None
-
-# ========== FUNÇÕES PARA EXPORTAÇÃO DE RELATÓRIOS ==========
-def gerar_relatorio_pdf(df):
-    """Gera um relatório PDF com análises"""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Título
-    pdf.set_fill_color(0, 174, 157)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font('Arial', 'B', 20)
-    pdf.cell(0, 20, 'Relatório Cocred', 0, 1, 'C', 1)
-    pdf.ln(10)
-    
-    # Data
-    pdf.set_text_color(0, 54, 65)
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(0, 10, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 1)
-    pdf.ln(5)
-    
-    # Estatísticas gerais
-    pdf.set_font('Arial', 'B', 12)
-    pdf.set_text_color(0, 174, 157)
-    pdf.cell(0, 10, 'Resumo Geral:', 0, 1)
-    pdf.set_font('Arial', '', 10)
-    pdf.set_text_color(0, 0, 0)
-    pdf.cell(0, 10, f'Total de registros: {len(df)}', 0, 1)
-    
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-    for col in numeric_cols[:3]:
-        pdf.cell(0, 10, f'Total {col}: {df[col].sum():,.2f}', 0, 1)
-        pdf.cell(0, 10, f'Média {col}: {df[col].mean():,.2f}', 0, 1)
-    
-    return pdf
-
-def exportar_excel_completo(df):
-    """Exporta todos os dados e análises para Excel"""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Dados Brutos', index=False)
-        
-        campaign_cols = [col for col in df.columns if any(x in col.lower() for x in ['campanha', 'campaign'])]
-        if campaign_cols:
-            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-            resumo = df.groupby(campaign_cols[0])[numeric_cols].sum()
-            resumo.to_excel(writer, sheet_name='Resumo por Campanha')
-        
-        stats = df.describe()
-        stats.to_excel(writer, sheet_name='Estatísticas')
-    
-    return output
-
-# ========== DASHBOARD DE MÉTRICAS ==========
-def dashboard_metricas(df):
-    """Dashboard com filtros, cards de métricas, descrições e tabela geral"""
-    
-    st.markdown("### 🔍 FILTROS")
-    
-    # Filtros em linha
-    col_f1, col_f2, col_f3, col_f4 = st.columns(4)
-    
-    with col_f1:
-        # Busca por "Ano da Campanha"
-        possiveis_ano = [
-            'Ano da Campanha',
-            'Ano', 'ano', 'ANO',
-            'Ano da campanha', 'ano da campanha'
-        ]
-        
-        col_ano = None
-        for nome in possiveis_ano:
-            if nome in df.columns:
-                col_ano = nome
-                break
-        
-        if col_ano:
-            anos = ['Todos'] + sorted(df[col_ano].astype(str).unique().tolist())
-            ano_sel = st.selectbox("Ano", anos, key="filtro_ano")
-        else:
-            ano_sel = st.selectbox("Ano", ['Todos'], key="filtro_ano")
-            st.caption("⚠️ Coluna 'Ano da Campanha' não encontrada")
-    
-    with col_f2:
-        camp_cols = [col for col in df.columns if any(x in col.lower() for x in ['campanha', 'campaign'])]
-        if camp_cols:
-            camps = ['Todas'] + df[camp_cols[0]].unique().tolist()
-            camp_sel = st.selectbox("Campanha", camps, key="filtro_campanha")
-        else:
-            camp_sel = st.selectbox("Campanha", ['Todas'], key="filtro_campanha")
-    
-    with col_f3:
-        if 'Meio' in df.columns:
-            meios = ['Todos'] + df['Meio'].unique().tolist()
-            meio_sel = st.selectbox("Meio", meios, key="filtro_meio")
-        else:
-            meio_sel = st.selectbox("Meio", ['Todos'], key="filtro_meio")
-    
-    with col_f4:
-        veic_col = None
-        if 'Veículo' in df.columns:
-            veic_col = 'Veículo'
-        elif 'Veiculo' in df.columns:
-            veic_col = 'Veiculo'
-        
-        if veic_col:
-            veics = ['Todos'] + df[veic_col].unique().tolist()
-            veic_sel = st.selectbox("Veículo", veics, key="filtro_veiculo")
-        else:
-            veic_sel = st.selectbox("Veículo", ['Todos'], key="filtro_veiculo")
-    
-    # Aplicar filtros
-    df_filtrado = df.copy()
-    
-    if col_ano and ano_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado[col_ano].astype(str) == ano_sel]
-    
-    if camp_cols and camp_sel != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado[camp_cols[0]] == camp_sel]
-    
-    if 'Meio' in df.columns and meio_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['Meio'] == meio_sel]
-    
-    if veic_col and veic_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado[veic_col] == veic_sel]
-    
-    st.markdown("---")
-    
-    # ========== BIG NUMBERS ==========
-    st.markdown("### 📊 BIG NUMBERS")
-    
-    # Busca por IMPACTO
-    possiveis_impacto = [
-        'Impacto (impressões e entrega de email)',
-        'Impacto', 'impacto', 'IMPACTO',
-        'Impressões', 'impressões', 'IMPRESSÕES',
-        'Impressoes', 'impressoes', 'IMPRESSOES',
-        'Visualizações', 'visualizações', 'VISUALIZAÇÕES',
-        'Visualizacoes', 'visualizacoes', 'VISUALIZACOES',
-        'views', 'Views', 'VIEWS',
-        'alcance', 'Alcance', 'ALCANCE'
-    ]
-    
-    col_impacto = None
-    for nome in possiveis_impacto:
-        if nome in df_filtrado.columns:
-            col_impacto = nome
-            break
-    
-    col_invest = next((col for col in ['Investimento', 'investimento', 'INVESTIMENTO', 'gasto', 'custo'] if col in df_filtrado.columns), None)
-    col_leads = next((col for col in ['Leads', 'leads', 'LEADS', 'conversoes', 'conversões'] if col in df_filtrado.columns), None)
-    
-    impacto = df_filtrado[col_impacto].sum() if col_impacto else 0
-    investimento = df_filtrado[col_invest].sum() if col_invest else 0
-    leads = df_filtrado[col_leads].sum() if col_leads else 0
-    
-    cpm = (investimento / impacto * 1000) if impacto > 0 else 0
-    cpl = (investimento / leads) if leads > 0 else 0
-    
-    # Cards
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-        st.markdown(f"""
-        <div style='background-color: {CORES['turquesa']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <p style='color: white; margin: 0; font-size: 14px;'>IMPACTO</p>
-            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>{impacto:,.0f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div style='background-color: {CORES['roxo']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <p style='color: white; margin: 0; font-size: 14px;'>INVESTIMENTO</p>
-            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {investimento:,.2f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div style='background-color: {CORES['verde_escuro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <p style='color: white; margin: 0; font-size: 14px;'>CPM</p>
-            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {cpm:.2f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown(f"""
-        <div style='background-color: {CORES['verde_claro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <p style='color: {CORES['verde_escuro']}; margin: 0; font-size: 14px; font-weight: bold;'>LEADS</p>
-            <p style='color: {CORES['verde_escuro']}; margin: 0; font-size: 28px; font-weight: bold;'>{leads:,.0f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col5:
-        st.markdown(f"""
-        <div style='background-color: {CORES['cinza_escuro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <p style='color: white; margin: 0; font-size: 14px;'>CPL</p>
-            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {cpl:.2f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # ========== DESCRIÇÕES DAS MÉTRICAS ==========
-    st.markdown("---")
-    st.markdown("### 📘 Entendendo as Métricas")
-    
-    col_desc1, col_desc2, col_desc3 = st.columns(3)
-    
-    with col_desc1:
-        st.markdown("""
-        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
-            <h5 style='color: #00AE9D; margin: 0;'>IMPACTO</h5>
-            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
-                Número total de impressões ou visualizações da campanha.<br>
-                <strong>Quanto maior, melhor o alcance.</strong>
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col_desc2:
-        st.markdown("""
-        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
-            <h5 style='color: #49479D; margin: 0;'>INVESTIMENTO</h5>
-            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
-                Valor total gasto na campanha.<br>
-                <strong>Base para cálculo das demais métricas.</strong>
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col_desc3:
-        st.markdown(f"""
-        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
-            <h5 style='color: {CORES['verde_escuro']}; margin: 0;'>LEADS</h5>
-            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
-                Número total de leads gerados.<br>
-                <strong>Total: {leads:,.0f} leads</strong><br>
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # ========== TABELA GERAL ==========
-    st.markdown("### 📋 TABELA GERAL")
-    
-    # Formata colunas de porcentagem na tabela
-    df_exibicao = df_filtrado.copy()
-    
-    # Detecta colunas que parecem ser taxas/percentuais
-    for col in df_exibicao.select_dtypes(include=['float64', 'int64']).columns:
-        # Se a coluna tem valores entre 0 e 1 (provável percentual)
-        if df_exibicao[col].min() >= 0 and df_exibicao[col].max() <= 1:
-            # Verifica se o nome da coluna sugere taxa
-            if any(palavra in col.lower() for palavra in ['taxa', 'percentual', 'porcentagem', 'ctr', 'conversão', 'abertura', 'clique']):
-                df_exibicao[col] = df_exibicao[col].apply(lambda x: formatar_percentual(x))
-    
-    st.dataframe(df_exibicao, use_container_width=True, height=400)
-    
-        # ========== EXPORTAÇÃO DE RELATÓRIOS (EM EXPANDER) ==========
-    with st.expander("📤 **Exportar Relatórios**", expanded=False):
-        st.markdown(f"""
-        <div style='background-color: {CORES['roxo']}10; padding: 15px; border-radius: 10px; margin-bottom: 20px; border-left: 5px solid {CORES['roxo']};'>
-            <p style='margin: 0; color: {CORES['texto_escuro']};'>Escolha o formato desejado para exportar os dados filtrados:</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col_exp1, col_exp2, col_exp3 = st.columns(3)
-        
-        with col_exp1:
-            st.markdown(f"""
-            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
-                <span style='font-size: 30px;'>📄</span>
-                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>PDF</h5>
-                <p style='color: gray; font-size: 12px; margin: 0;'>Relatório executivo</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("📥 Gerar PDF", key="btn_pdf", use_container_width=True):
-                with st.spinner("Gerando PDF..."):
-                    try:
-                        pdf = gerar_relatorio_pdf(df_filtrado)
-                        
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                            pdf.output(tmp_file.name)
-                            tmp_file_path = tmp_file.name
-                        
-                        with open(tmp_file_path, 'rb') as f:
-                            pdf_bytes = f.read()
-                        
-                        os.unlink(tmp_file_path)
-                        
-                        st.download_button(
-                            label="📥 Clique para baixar PDF",
-                            data=pdf_bytes,
-                            file_name=f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                            mime="application/pdf",
-                            key="download_pdf"
-                        )
-                    except Exception as e:
-                        st.error(f"Erro ao gerar PDF: {str(e)}")
-        
-        with col_exp2:
-            st.markdown(f"""
-            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
-                <span style='font-size: 30px;'>📊</span>
-                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>Excel</h5>
-                <p style='color: gray; font-size: 12px; margin: 0;'>Planilha completa</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("📥 Gerar Excel", key="btn_excel", use_container_width=True):
-                with st.spinner("Gerando Excel..."):
-                    excel_bytes = exportar_excel_completo(df_filtrado)
-                    
-                    st.download_button(
-                        label="📥 Clique para baixar Excel",
-                        data=excel_bytes.getvalue(),
-                        file_name=f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        key="download_excel"
-                    )
-        
-        with col_exp3:
-            st.markdown(f"""
-            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
-                <span style='font-size: 30px;'>📈</span>
-                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>CSV</h5>
-                <p style='color: gray; font-size: 12px; margin: 0;'>Dados brutos</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            csv = df_filtrado.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv,
-                file_name=f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                mime="text/csv",
-                key="download_csv",
-                use_container_width=True
-            )
-        
-        # Preview dos dados - AGORA FORA DO EXPANDER, mas ainda dentro do expander principal
-        st.markdown("---")
-        st.markdown("##### 🔍 Preview dos dados que serão exportados")
-        st.dataframe(df_filtrado.head(10), use_container_width=True)
-        st.caption(f"Mostrando 10 de {len(df_filtrado)} linhas")
-
-# ========== INICIALIZAÇÃO ==========
-if 'df' not in st.session_state:
-    st.session_state.df = None
-if 'file_metadata' not in st.session_state:
-    st.session_state.file_metadata = None
-if 'token' not in st.session_state:
-    st.session_state.token = None
-
-# ========== MENU LATERAL ==========
-with st.sidebar:
-    st.markdown(f"""
-    <div style='text-align: center; padding: 20px; background: linear-gradient(135deg, {CORES['turquesa']}, {CORES['roxo']}); border-radius: 10px; margin-bottom: 20px;'>
-        <h2 style='color: white; margin: 0;'>Cocred</h2>
-        <p style='color: white; margin: 0;'>Análise consolidada de campanhas</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.link_button("📊 ABRIR EXCEL ONLINE", EXCEL_ONLINE_URL, use_container_width=True, type="primary")
-    
-    st.markdown("---")
-    st.subheader("📥 Carregar Dados")
-    
-    if st.button("🔄 Carregar Planilha", use_container_width=True):
-        with st.spinner("Conectando ao SharePoint..."):
-            token = get_access_token()
-            if token:
-                st.session_state.token = token
-                
-                with st.spinner("Baixando dados..."):
-                    file_bytes = download_excel(token)
-                    if file_bytes:
-                        st.session_state.df = pd.read_excel(file_bytes)
-                        
-                        metadata = get_file_metadata(token)
-                        if metadata:
-                            st.session_state.file_metadata = metadata
-                        
-                        st.success(f"✅ Dados carregados! {len(st.session_state.df)} linhas")
-                        st.rerun()
-    
-    if st.session_state.file_metadata:
-        st.markdown("---")
-        st.subheader("ℹ️ Info")
-        meta = st.session_state.file_metadata
-        
-        modified = meta.get('lastModifiedDateTime', 'N/A')
-        if modified != 'N/A':
-            modified = datetime.fromisoformat(modified.replace('Z', '+00:00')).strftime('%d/%m/%Y %H:%M')
-        
-        st.write(f"**Arquivo:** {meta.get('name', 'N/A')}")
-        st.write(f"**Modificado:** {modified}")
-        if st.session_state.df is not None:
-            st.write(f"**Linhas:** {len(st.session_state.df)}")
-            st.write(f"**Colunas:** {len(st.session_state.df.columns)}")
-    
-    if st.session_state.df is not None:
-        st.markdown("---")
-        if st.button("🗑️ Limpar", use_container_width=True):
-            st.session_state.df = None
-            st.session_state.file_metadata = None
-            st.rerun()
-
-# ========== ÁREA PRINCIPAL ==========
-if st.session_state.df is not None:
-    df = st.session_state.df
-    
-    # Agora apenas o dashboard de métricas, sem abas
-    dashboard_metricas(df)
-
-else:
-    # Tela inicial
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        st.markdown(f"""
-        <div style='background-color: white; padding: 40px; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <span style='font-size: 60px;'>👋</span>
-            <h3 style='color: {CORES['verde_escuro']};'>Bem-vindo ao Dashboard Cocred</h3>
-            <p style='color: gray;'>Clique em 'Carregar Planilha' no menu lateral para começar.</p>
-            <div style='margin-top: 20px;'>
-                <span style='background-color: {CORES['turquesa']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Turquesa</span>
-                <span style='background-color: {CORES['verde_claro']}; color: {CORES['verde_escuro']}; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Verde Claro</span>
-                <span style='background-color: {CORES['verde_escuro']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Verde Escuro</span>
-                <span style='background-color: {CORES['roxo']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Roxo</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div style='background: linear-gradient(135deg, {CORES['turquesa']}20, {CORES['roxo']}20); padding: 40px; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            <span style='font-size: 60px;'>📊</span>
-            <h3 style='color: {CORES['roxo']};'>Editar Planilha</h3>
-            <p style='color: {CORES['texto_escuro']};'>Use o Excel Online para fazer alterações diretamente no navegador.</p>
-            <div style='margin-top: 20px;'>
-                <a href='{EXCEL_ONLINE_URL}' target='_blank' style='background-color: {CORES['turquesa']}; color: white; padding: 10px 30px; border-radius: 5px; text-decoration: none; font-weight: bold;'>Abrir Excel Online</a>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-# ========== RODAPÉ ==========
-st.markdown("---")
-st.markdown(f"""
-<div class='footer'>
-    <span>🕒 {datetime.now().strftime('%d/%m/%Y %H:%M')}</span> • 
-    <span style='color: {CORES['turquesa']};'>Cocred</span> • 
-    <span style='color: {CORES['roxo']};'>Visão Geral</span> • 
-    <span>v7.1 - Com Exportação</span>
-</div>
+import streamlit as st
+import pandas as pd
+import numpy as np
+import msal
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import datetime
+import os
+import uuid
+from collections import OrderedDict
+from agregacoes import CuboKPIs, IndiceFiltros, assinatura_linhas, linhas_acrescentadas
+from dataset_store import DatasetStore
+from esquema import colunas_enxutas, dtypes_dimensoes, resolver_papeis
+from excel_loader import ler_cabecalho, ler_planilha
+from exportacoes import FilaExportacoes
+from formatacao import formatar_percentuais
+from graph_client import AuthError, GraphClient, GraphError, TokenCache
+import paginacao
+from relatorios import EXCEL_STREAMING_A_PARTIR_DE, exportar_excel_completo, gerar_relatorio_executivo
+from snapshot import SnapshotStore
+
+# ========== CORES OFICIAIS DA COCRED ==========
+CORES = {
+    'turquesa': '#00AE9D',
+    'verde_claro': '#C9D200',
+    'verde_escuro': '#003641',
+    'roxo': '#49479D',
+    'background': '#F5F7FA',
+    'texto_escuro': '#2C3E50',
+    'texto_claro': '#FFFFFF',
+    'cinza_claro': '#E8ECF1',
+    'branco': '#FFFFFF',
+    'cinza_medio': '#CCCCCC',
+    'cinza_escuro': '#666666',
+    'sucesso': '#28A745',
+    'erro': '#DC3545',
+    'alerta': '#FFC107'
+}
+
+# Configuração do tema Plotly com as cores da Cocred
+PLOTLY_TEMA = {
+    'layout': {
+        'font': {'color': CORES['texto_escuro']},
+        'title': {'font': {'color': CORES['verde_escuro'], 'size': 18}},
+        'xaxis': {'gridcolor': CORES['cinza_claro'], 'linecolor': CORES['cinza_claro']},
+        'yaxis': {'gridcolor': CORES['cinza_claro'], 'linecolor': CORES['cinza_claro']},
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+        'colorway': [CORES['turquesa'], CORES['roxo'], CORES['verde_claro'], CORES['verde_escuro']]
+    }
+}
+
+# Copy-on-write: seleções de linhas/colunas e assign compartilham os dados com a
+# planilha em cache e só copiam o que for de fato alterado
+pd.options.mode.copy_on_write = True
+
+# ========== CONFIGURAÇÕES DO AZURE ==========
+TENANT_ID = st.secrets["TENANT_ID"]
+CLIENT_ID = st.secrets["CLIENT_ID"]
+CLIENT_SECRET = st.secrets["CLIENT_SECRET"]
+DRIVE_ID = st.secrets["DRIVE_ID"]
+ITEM_ID = st.secrets["ITEM_ID"]
+
+# Memória máxima (MB) do cache de planilhas compartilhado entre as sessões
+LIMITE_CACHE_MB = int(st.secrets.get("LIMITE_CACHE_MB", 1024))
+
+# Motor de leitura do Excel: 'auto' (calamine se instalado), 'calamine' ou 'openpyxl'
+MOTOR_EXCEL = st.secrets.get("MOTOR_EXCEL", "auto")
+
+# 'enxuto' lê só as colunas usadas pelo dashboard; a planilha completa é lida sob
+# demanda (Tabela Geral com todas as colunas e exportações). 'completo' lê tudo sempre.
+MODO_CARREGAMENTO = st.secrets.get("MODO_CARREGAMENTO", "enxuto")
+
+# A partir de quantas linhas o Excel exportado é gravado em streaming; o padrão vem de relatorios.py
+EXCEL_STREAMING_A_PARTIR_DE = int(st.secrets.get("EXCEL_STREAMING_A_PARTIR_DE", EXCEL_STREAMING_A_PARTIR_DE))
+
+# Quantos arquivos exportados (PDF/Excel/CSV) cada sessão mantém prontos para download
+MAX_EXPORTACOES_SESSAO = 6
+
+# Exportações geradas ao mesmo tempo em segundo plano (somando todas as sessões)
+MAX_EXPORTACOES_SIMULTANEAS = int(st.secrets.get("MAX_EXPORTACOES_SIMULTANEAS", 2))
+
+# Intervalo (segundos) entre as atualizações do progresso de uma exportação
+INTERVALO_PROGRESSO_EXPORTACAO = 1
+
+# Opções de linhas por página da Tabela Geral (só a página visível é enviada ao navegador)
+TAMANHOS_PAGINA = [50, 100, 250, 500]
+
+# Pasta dos snapshots (Feather) das planilhas já lidas, reaproveitados após reinícios
+DIRETORIO_SNAPSHOTS = st.secrets.get(
+    "DIRETORIO_SNAPSHOTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'snapshots')
+)
+
+# Link direto para o Excel Online
+EXCEL_ONLINE_URL = "https://agenciaideatore-my.sharepoint.com/:x:/r/personal/cristini_cordesco_ideatoreamericas_com/_layouts/15/Doc.aspx?sourcedoc=%7B198c1ffa-cc36-4faa-a79f-f041003b786a%7D&action=default"
+# ========================================
+
+# ========== CONFIGURAÇÃO DA PÁGINA ==========
+st.set_page_config(
+    page_title="Dashboard Cocred - Campanhas",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# CSS personalizado
+st.markdown(f"""
+<style>
+    h1, h2, h3 {{ color: {CORES['verde_escuro']} !important; }}
+    .stMetric {{ background-color: {CORES['branco']}; padding: 15px; border-radius: 10px; border-left: 5px solid {CORES['turquesa']}; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
+    .stButton button {{ background-color: {CORES['turquesa']}; color: white; border: none; border-radius: 5px; padding: 10px 20px; font-weight: bold; transition: all 0.3s; }}
+    .stButton button:hover {{ background-color: {CORES['roxo']}; }}
+    .stLinkButton button {{ background: linear-gradient(135deg, {CORES['turquesa']}, {CORES['roxo']}); color: white; font-size: 18px; padding: 15px; border-radius: 10px; border: none; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
+    .footer {{ color: {CORES['cinza_escuro']}; font-size: 12px; text-align: center; padding: 20px; border-top: 1px solid {CORES['cinza_claro']}; }}
+    .tooltip {{ position: relative; display: inline-block; cursor: help; }}
+    .tooltip .tooltiptext {{ visibility: hidden; width: 200px; background-color: {CORES['verde_escuro']}; color: white; text-align: center; border-radius: 6px; padding: 5px; position: absolute; z-index: 1; bottom: 125%; left: 50%; margin-left: -100px; opacity: 0; transition: opacity 0.3s; }}
+    .tooltip:hover .tooltiptext {{ visibility: visible; opacity: 1; }}
+</style>
+""", unsafe_allow_html=True)
+
+# ========== TÍTULO PRINCIPAL ==========
+st.markdown(f"""
+<div style='text-align: center; padding: 20px; background: linear-gradient(135deg, {CORES['turquesa']}20, {CORES['roxo']}20); border-radius: 15px; margin-bottom: 20px;'>
+    <h1 style='color: {CORES['verde_escuro']}; margin-bottom: 0;'>📊 Dashboard Cocred - Campanhas</h1>
+    <p style='color: {CORES['texto_escuro']};'>Análise consolidada de campanhas</p>
+</div>
+""", unsafe_allow_html=True)
+
+# ========== FUNÇÕES DE AUTENTICAÇÃO ==========
+@st.cache_resource
+def get_msal_app():
+    authority = f"https://login.microsoftonline.com/{TENANT_ID}"
+    return msal.ConfidentialClientApplication(
+        client_id=CLIENT_ID,
+        client_credential=CLIENT_SECRET,
+        authority=authority
+    )
+
+@st.cache_resource
+def get_token_cache():
+    app = get_msal_app()
+    scopes = ["https://graph.microsoft.com/.default"]
+    return TokenCache(lambda: app.acquire_token_for_client(scopes=scopes))
+
+def get_access_token():
+    try:
+        return get_token_cache().obter()
+    except AuthError as e:
+        st.error(f"Erro de autenticação: {str(e)}")
+        return None
+
+@st.cache_resource
+def get_graph_client():
+    token_cache = get_token_cache()
+    return GraphClient(DRIVE_ID, ITEM_ID, token_cache.obter, invalidar_token=token_cache.invalidar)
+
+def download_excel(tamanho=None, progresso=None):
+    try:
+        return get_graph_client().download_content(tamanho, progresso)
+    except (GraphError, AuthError) as e:
+        st.error(f"Erro ao baixar: {str(e)}")
+        return None
+
+def get_file_metadata():
+    try:
+        return get_graph_client().get_metadata()
+    except (GraphError, AuthError) as e:
+        st.warning(f"Não foi possível ler os metadados do arquivo: {str(e)}")
+        return None
+
+def download_metadata_e_excel(progresso=None):
+    """Baixa metadados e planilha em paralelo (carga a frio)"""
+    try:
+        return get_graph_client().get_metadata_e_conteudo(progresso)
+    except (GraphError, AuthError) as e:
+        st.error(f"Erro ao baixar: {str(e)}")
+        return None, None
+
+def barra_progresso_download():
+    """Cria a barra de progresso do download e retorna a função que a atualiza"""
+    barra = st.progress(0.0, text="Baixando dados...")
+
+    def atualizar(baixados, total):
+        mb = baixados / 1024 / 1024
+        if total:
+            barra.progress(min(baixados / total, 1.0), text=f"Baixando dados... {mb:.1f} de {total / 1024 / 1024:.1f} MB")
+        else:
+            barra.progress(0.0, text=f"Baixando dados... {mb:.1f} MB")
+
+    return atualizar
+
+# ========== CACHE COMPARTILHADO DE PLANILHAS ==========
+@st.cache_resource
+def get_dataset_store():
+    return DatasetStore(limite_bytes=LIMITE_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore(DIRETORIO_SNAPSHOTS)
+
+def versao_planilha(metadata):
+    """Versão do conteúdo do arquivo: cTag, eTag ou data de modificação, nessa ordem"""
+    if not metadata:
+        return None
+    # O cTag muda só quando o conteúdo muda; o eTag muda também com renomeações etc.
+    return metadata.get('cTag') or metadata.get('eTag') or metadata.get('lastModifiedDateTime')
+
+# Prefixo da versão das cargas feitas sem metadados (não compartilhadas)
+SEM_VERSAO = 'sem-versao-'
+
+def chave_dataset(metadata, variante=MODO_CARREGAMENTO):
+    """Identifica a versão da planilha (e a variante 'enxuto'/'completo') no cache compartilhado"""
+    versao = versao_planilha(metadata)
+    # Sem metadados não há como saber a versão: a carga não é compartilhada
+    return (DRIVE_ID, ITEM_ID, versao or f"{SEM_VERSAO}{uuid.uuid4().hex}", variante)
+
+def carregar_planilha(chave, metadata, file_bytes=None, verificar_versao=False):
+    """Lê a versão do snapshot local ou, se não houver, baixa e lê o Excel"""
+    snapshots = get_snapshot_store()
+    if metadata:
+        df = snapshots.carregar(chave)
+        if df is not None:
+            if file_bytes is not None:
+                file_bytes.close()
+            return df
+
+    if file_bytes is None:
+        # Carga sem versão conhecida: não há com o que comparar a versão atual
+        if (verificar_versao and not chave[2].startswith(SEM_VERSAO)
+                and versao_planilha(get_file_metadata()) != chave[2]):
+            st.warning("⚠️ A planilha mudou no SharePoint desde o carregamento. Clique em 'Carregar Planilha' novamente.")
+            return None
+        tamanho = metadata.get('size') if metadata else None
+        file_bytes = download_excel(tamanho, barra_progresso_download())
+    if file_bytes is None:
+        return None
+
+    with file_bytes:
+        colunas = ler_cabecalho(file_bytes, MOTOR_EXCEL)
+        usecols = colunas_enxutas(colunas) if chave[3] == 'enxuto' else None
+        df = ler_planilha(file_bytes, MOTOR_EXCEL, usecols=usecols, dtype=dtypes_dimensoes(colunas))
+    if metadata:
+        snapshots.salvar(chave, df)
+    return df
+
+def aproveitar_versao_anterior(chave_anterior, chave, df_novo):
+    """Estende o índice de filtros e o cubo da versão anterior quando a nova só acrescentou linhas.
+
+    As versões são comparadas pelo hash de cada linha; só as linhas novas são
+    codificadas e somadas. Qualquer edição, remoção ou mudança nas colunas faz
+    os derivados serem recalculados do zero, sob demanda.
+    """
+    if chave_anterior is None or chave_anterior[:2] != chave[:2] or chave_anterior[3] != chave[3]:
+        return
+    df_anterior = store.obter(chave_anterior)
+    if df_anterior is None or list(df_anterior.columns) != list(df_novo.columns):
+        return
+
+    assinatura_anterior = store.derivado(chave_anterior, 'assinatura_linhas', lambda: assinatura_linhas(df_anterior))
+    assinatura = store.derivado(chave, 'assinatura_linhas', lambda: assinatura_linhas(df_novo))
+    inicio = linhas_acrescentadas(assinatura_anterior, assinatura)
+    if inicio is None:
+        return
+
+    papeis_anteriores = store.derivado(chave_anterior, 'papeis', lambda: resolver_papeis(df_anterior))
+    papeis = store.derivado(chave, 'papeis', lambda: resolver_papeis(df_novo))
+    if papeis != papeis_anteriores:
+        return
+
+    indice_anterior = store.derivado(chave_anterior, 'indice_filtros', lambda: IndiceFiltros(df_anterior, papeis))
+    cubo_anterior = store.derivado(chave_anterior, 'cubo_kpis', lambda: CuboKPIs(df_anterior, papeis, indice_anterior))
+    estendido, remapeamentos = indice_anterior.estendido(df_novo, inicio)
+    # Outra sessão pode ter montado o índice da nova versão antes; o cubo precisa ser do mesmo índice
+    if store.derivado(chave, 'indice_filtros', lambda: estendido) is estendido:
+        store.derivado(
+            chave, 'cubo_kpis',
+            lambda: cubo_anterior.estendido(df_novo, papeis, estendido, inicio, remapeamentos)
+        )
+
+def obter_dataset_completo(df):
+    """Planilha com todas as colunas; no modo enxuto é carregada só na primeira vez que é pedida"""
+    chave = st.session_state.dataset_key
+    if chave[3] == 'completo':
+        return df
+
+    chave_completa = chave[:3] + ('completo',)
+    metadata = st.session_state.file_metadata
+    with st.spinner("Carregando todas as colunas da planilha..."):
+        return store.obter_ou_carregar(
+            chave_completa,
+            lambda: carregar_planilha(chave_completa, metadata, verificar_versao=True),
+            st.session_state.sessao_id
+        )
+
+def liberar_versao(chave):
+    """Libera a versão da sessão no cache compartilhado, junto com a variante 'completo' que ela tenha usado"""
+    store.liberar(chave, st.session_state.sessao_id)
+    store.liberar(chave[:3] + ('completo',), st.session_state.sessao_id)
+
+# ========== FUNÇÕES PARA EXPORTAÇÃO DE RELATÓRIOS ==========
+@st.cache_resource
+def get_fila_exportacoes():
+    return FilaExportacoes(max_simultaneos=MAX_EXPORTACOES_SIMULTANEAS)
+
+def obter_exportacao(formato, selecoes, preparar=None):
+    """Trabalho de exportação (ver ``exportacoes.Trabalho``) da versão da planilha e dos filtros atuais.
+
+    A sessão guarda os ids dos trabalhos por (versão, filtros, formato): baixar
+    de novo a mesma visão não gera nada. Sem ``preparar`` só consulta; com ele
+    envia o trabalho para a fila quando ainda não existe (ou falhou).
+    ``preparar()`` roda na thread do script e retorna a função
+    ``gerar(progresso)`` executada em segundo plano, ou None quando os dados
+    não estão disponíveis (nada é enviado).
+    """
+    fila = get_fila_exportacoes()
+    cache = st.session_state.exportacoes
+    chave = (st.session_state.dataset_key, tuple(selecoes.items()), formato)
+    trabalho = fila.obter(cache[chave]) if chave in cache else None
+    if trabalho is not None and (preparar is None or trabalho.estado != 'erro'):
+        cache.move_to_end(chave)
+        return trabalho
+    if preparar is None:
+        cache.pop(chave, None)
+        return None
+
+    gerar = preparar()
+    if gerar is None:
+        return None
+    trabalho = fila.enviar(chave, gerar)
+    cache[chave] = trabalho.id
+    cache.move_to_end(chave)
+    while len(cache) > MAX_EXPORTACOES_SESSAO:
+        cache.popitem(last=False)
+    return trabalho
+
+def acompanhar_exportacao(id_trabalho):
+    """Progresso do trabalho, atualizado sozinho (fragmento) até terminar"""
+    trabalho = get_fila_exportacoes().obter(id_trabalho)
+    if trabalho is None or not trabalho.em_andamento:
+        # Terminou: a página inteira é refeita para mostrar o download
+        st.rerun()
+    st.progress(trabalho.progresso, text=trabalho.mensagem)
+
+def painel_exportacao(formato, selecoes, preparar, rotulo, mime, largura_total=False):
+    """Botão para gerar, progresso da geração em segundo plano e botão de download"""
+    trabalho = obter_exportacao(formato, selecoes)
+    if trabalho is not None and trabalho.estado == 'erro':
+        st.error(f"Erro ao gerar {rotulo}: {trabalho.erro}")
+    if trabalho is None or trabalho.estado == 'erro':
+        if not st.button(f"📥 Gerar {rotulo}", key=f"btn_{formato}", use_container_width=True):
+            return
+        trabalho = obter_exportacao(formato, selecoes, preparar)
+        if trabalho is None:
+            return
+    
+    if trabalho.em_andamento:
+        st.fragment(acompanhar_exportacao, run_every=INTERVALO_PROGRESSO_EXPORTACAO)(trabalho.id)
+    elif trabalho.resultado:
+        st.download_button(
+            label=f"📥 Clique para baixar {rotulo}",
+            data=trabalho.resultado[1],
+            file_name=trabalho.resultado[0],
+            mime=mime,
+            key=f"download_{formato}",
+            use_container_width=largura_total
+        )
+
+# ========== DASHBOARD DE MÉTRICAS ==========
+def dashboard_metricas(df, papeis, indice, cubo):
+    """Dashboard com filtros, cards de métricas, descrições e tabela geral"""
+    
+    st.markdown("### 🔍 FILTROS")
+    
+    col_camp = papeis['campanha']
+    
+    # Filtros em linha
+    col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+    
+    with col_f1:
+        anos = ['Todos'] + indice.opcoes('ano')
+        ano_sel = st.selectbox("Ano", anos, key="filtro_ano")
+        if 'ano' not in indice:
+            st.caption("⚠️ Coluna 'Ano da Campanha' não encontrada")
+    
+    with col_f2:
+        camps = ['Todas'] + indice.opcoes('campanha')
+        camp_sel = st.selectbox("Campanha", camps, key="filtro_campanha")
+    
+    with col_f3:
+        meios = ['Todos'] + indice.opcoes('meio')
+        meio_sel = st.selectbox("Meio", meios, key="filtro_meio")
+    
+    with col_f4:
+        veics = ['Todos'] + indice.opcoes('veiculo')
+        veic_sel = st.selectbox("Veículo", veics, key="filtro_veiculo")
+    
+    # Aplicar filtros: posições das linhas selecionadas (None = todas)
+    selecoes = {
+        'ano': None if ano_sel == 'Todos' else ano_sel,
+        'campanha': None if camp_sel == 'Todas' else camp_sel,
+        'meio': None if meio_sel == 'Todos' else meio_sel,
+        'veiculo': None if veic_sel == 'Todos' else veic_sel,
+    }
+    posicoes = indice.filtrar(selecoes)
+    
+    def linhas_filtradas(tabela):
+        # Sem filtro a própria planilha é usada, sem cópia
+        return tabela if posicoes is None else tabela.iloc[posicoes]
+    
+    df_filtrado = linhas_filtradas(df)
+    
+    st.markdown("---")
+    
+    # ========== BIG NUMBERS ==========
+    st.markdown("### 📊 BIG NUMBERS")
+    
+    # Somas vindas do cubo pré-agregado; CPM e CPL derivam delas
+    totais = cubo.totais(selecoes)
+    impacto = totais['impacto']
+    investimento = totais['investimento']
+    leads = totais['leads']
+    
+    cpm = (investimento / impacto * 1000) if impacto > 0 else 0
+    cpl = (investimento / leads) if leads > 0 else 0
+    
+    # Cards
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.markdown(f"""
+        <div style='background-color: {CORES['turquesa']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='color: white; margin: 0; font-size: 14px;'>IMPACTO</p>
+            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>{impacto:,.0f}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div style='background-color: {CORES['roxo']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='color: white; margin: 0; font-size: 14px;'>INVESTIMENTO</p>
+            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {investimento:,.2f}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown(f"""
+        <div style='background-color: {CORES['verde_escuro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='color: white; margin: 0; font-size: 14px;'>CPM</p>
+            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {cpm:.2f}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f"""
+        <div style='background-color: {CORES['verde_claro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='color: {CORES['verde_escuro']}; margin: 0; font-size: 14px; font-weight: bold;'>LEADS</p>
+            <p style='color: {CORES['verde_escuro']}; margin: 0; font-size: 28px; font-weight: bold;'>{leads:,.0f}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col5:
+        st.markdown(f"""
+        <div style='background-color: {CORES['cinza_escuro']}; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='color: white; margin: 0; font-size: 14px;'>CPL</p>
+            <p style='color: white; margin: 0; font-size: 28px; font-weight: bold;'>R$ {cpl:.2f}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # ========== DESCRIÇÕES DAS MÉTRICAS ==========
+    st.markdown("---")
+    st.markdown("### 📘 Entendendo as Métricas")
+    
+    col_desc1, col_desc2, col_desc3 = st.columns(3)
+    
+    with col_desc1:
+        st.markdown("""
+        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
+            <h5 style='color: #00AE9D; margin: 0;'>IMPACTO</h5>
+            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
+                Número total de impressões ou visualizações da campanha.<br>
+                <strong>Quanto maior, melhor o alcance.</strong>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col_desc2:
+        st.markdown("""
+        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
+            <h5 style='color: #49479D; margin: 0;'>INVESTIMENTO</h5>
+            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
+                Valor total gasto na campanha.<br>
+                <strong>Base para cálculo das demais métricas.</strong>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col_desc3:
+        st.markdown(f"""
+        <div style='background-color: #f8f9fa; padding: 15px; border-radius: 10px; height: 150px;'>
+            <h5 style='color: {CORES['verde_escuro']}; margin: 0;'>LEADS</h5>
+            <p style='font-size: 12px; color: #666; margin-top: 5px;'>
+                Número total de leads gerados.<br>
+                <strong>Total: {leads:,.0f} leads</strong><br>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    # ========== TABELA GERAL ==========
+    st.markdown("### 📋 TABELA GERAL")
+    
+    # Planilha inteira; os filtros entram como posições das linhas
+    df_tabela = df
+    if MODO_CARREGAMENTO == 'enxuto' and st.toggle("Mostrar todas as colunas da planilha", key="tabela_completa"):
+        df_completo = obter_dataset_completo(df)
+        if df_completo is not None:
+            df_tabela = df_completo
+    
+    # Busca, ordenação e paginação no servidor: só a página visível vai para o navegador
+    col_t1, col_t2, col_t3, col_t4 = st.columns([3, 2, 1, 1])
+    
+    with col_t1:
+        termo = st.text_input("Buscar", key="tabela_busca", placeholder="Texto em qualquer coluna de texto")
+    
+    with col_t2:
+        ordenar_por = st.selectbox("Ordenar por", ['(ordem da planilha)'] + df_tabela.columns.tolist(), key="tabela_ordem")
+    
+    with col_t3:
+        sentido = st.selectbox("Sentido", ['Crescente', 'Decrescente'], key="tabela_sentido")
+    
+    with col_t4:
+        tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1, key="tabela_tamanho")
+    
+    linhas_tabela = np.arange(len(df_tabela)) if posicoes is None else posicoes
+    linhas_tabela = paginacao.buscar(df_tabela, linhas_tabela, termo)
+    if ordenar_por != '(ordem da planilha)':
+        chave = store.derivado(
+            st.session_state.dataset_key, ('ordenacao', ordenar_por),
+            lambda: paginacao.chave_ordenacao(df_tabela[ordenar_por])
+        )
+        linhas_tabela = paginacao.ordenar(linhas_tabela, chave, sentido == 'Crescente')
+    
+    # Filtros, busca ou ordenação novos voltam para a primeira página
+    consulta = (tuple(selecoes.values()), termo, ordenar_por, sentido, tamanho_pagina, df_tabela.shape)
+    if st.session_state.get('tabela_consulta') != consulta:
+        st.session_state.tabela_consulta = consulta
+        st.session_state.tabela_pagina = 1
+    
+    total_paginas = max(1, -(-len(linhas_tabela) // tamanho_pagina))
+    numero_pagina = st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="tabela_pagina")
+    linhas_pagina, total_paginas = paginacao.pagina(linhas_tabela, numero_pagina, tamanho_pagina)
+    
+    # Colunas de taxa (decididas uma vez por versão) exibidas como percentual
+    df_exibicao, config_colunas = formatar_percentuais(df_tabela.iloc[linhas_pagina], papeis['percentuais'])
+    
+    st.dataframe(df_exibicao, use_container_width=True, height=400, column_config=config_colunas)
+    
+    inicio = (numero_pagina - 1) * tamanho_pagina
+    st.caption(
+        f"Linhas {inicio + 1 if len(linhas_pagina) else 0}–{inicio + len(linhas_pagina)} "
+        f"de {len(linhas_tabela)} · página {numero_pagina} de {total_paginas}"
+    )
+    
+        # ========== EXPORTAÇÃO DE RELATÓRIOS (EM EXPANDER) ==========
+    def dados_exportacao():
+        """Linhas filtradas com todas as colunas da planilha, ou None se elas não puderem ser carregadas"""
+        df_completo = obter_dataset_completo(df)
+        if df_completo is None:
+            # Sem o arquivo só com as colunas do dashboard: ele ficaria na fila sob a chave da exportação completa
+            st.error("❌ Não foi possível carregar todas as colunas da planilha para a exportação.")
+            return None
+        return linhas_filtradas(df_completo)
+    
+    with st.expander("📤 **Exportar Relatórios**", expanded=False):
+        st.markdown(f"""
+        <div style='background-color: {CORES['roxo']}10; padding: 15px; border-radius: 10px; margin-bottom: 20px; border-left: 5px solid {CORES['roxo']};'>
+            <p style='margin: 0; color: {CORES['texto_escuro']};'>Escolha o formato desejado para exportar os dados filtrados:</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col_exp1, col_exp2, col_exp3 = st.columns(3)
+        
+        with col_exp1:
+            st.markdown(f"""
+            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
+                <span style='font-size: 30px;'>📄</span>
+                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>PDF</h5>
+                <p style='color: gray; font-size: 12px; margin: 0;'>Relatório executivo</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            def preparar_pdf():
+                def gerar(progresso):
+                    # Relatório executivo montado a partir do cubo de KPIs, direto em memória
+                    pdf_bytes = gerar_relatorio_executivo(cubo, selecoes, progresso=progresso)
+                    return f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf", pdf_bytes
+                return gerar
+            
+            # Só gera quando pedido (em segundo plano); a mesma visão já gerada é reaproveitada
+            painel_exportacao('pdf', selecoes, preparar_pdf, 'PDF', "application/pdf")
+        
+        with col_exp2:
+            st.markdown(f"""
+            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
+                <span style='font-size: 30px;'>📊</span>
+                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>Excel</h5>
+                <p style='color: gray; font-size: 12px; margin: 0;'>Planilha completa</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            def preparar_excel():
+                # As linhas são separadas aqui, na thread do script; a gravação fica em segundo plano
+                dados = dados_exportacao()
+                if dados is None:
+                    return None
+                def gerar(progresso):
+                    excel_bytes = exportar_excel_completo(dados, col_camp, progresso, EXCEL_STREAMING_A_PARTIR_DE)
+                    return f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx", excel_bytes.getvalue()
+                return gerar
+            
+            painel_exportacao(
+                'excel', selecoes, preparar_excel, 'Excel',
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        
+        with col_exp3:
+            st.markdown(f"""
+            <div style='background-color: white; padding: 15px; border-radius: 10px; text-align: center; border: 1px solid {CORES['cinza_claro']}; margin-bottom: 10px;'>
+                <span style='font-size: 30px;'>📈</span>
+                <h5 style='color: {CORES['verde_escuro']}; margin: 5px 0;'>CSV</h5>
+                <p style='color: gray; font-size: 12px; margin: 0;'>Dados brutos</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            def preparar_csv():
+                dados = dados_exportacao()
+                if dados is None:
+                    return None
+                def gerar(progresso):
+                    progresso(0.1, "Gravando o CSV...")
+                    csv = dados.to_csv(index=False).encode('utf-8')
+                    return f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv", csv
+                return gerar
+            
+            painel_exportacao('csv', selecoes, preparar_csv, 'CSV', "text/csv", largura_total=True)
+        
+        # Preview dos dados - AGORA FORA DO EXPANDER, mas ainda dentro do expander principal
+        st.markdown("---")
+        st.markdown("##### 🔍 Preview dos dados que serão exportados")
+        st.dataframe(df_filtrado.head(10), use_container_width=True)
+        st.caption(f"Mostrando 10 de {len(df_filtrado)} linhas")
+
+# ========== INICIALIZAÇÃO ==========
+if 'dataset_key' not in st.session_state:
+    st.session_state.dataset_key = None
+if 'sessao_id' not in st.session_state:
+    st.session_state.sessao_id = uuid.uuid4().hex
+if 'file_metadata' not in st.session_state:
+    st.session_state.file_metadata = None
+if 'exportacoes' not in st.session_state:
+    st.session_state.exportacoes = OrderedDict()
+
+store = get_dataset_store()
+df = None
+if st.session_state.dataset_key is not None:
+    df = store.obter(st.session_state.dataset_key, st.session_state.sessao_id)
+    if df is None:
+        # A versão foi descartada do cache (limite de memória): precisa recarregar
+        st.session_state.dataset_key = None
+        st.session_state.file_metadata = None
+        st.warning("⚠️ Os dados foram descartados do cache. Clique em 'Carregar Planilha' novamente.")
+
+# ========== MENU LATERAL ==========
+with st.sidebar:
+    st.markdown(f"""
+    <div style='text-align: center; padding: 20px; background: linear-gradient(135deg, {CORES['turquesa']}, {CORES['roxo']}); border-radius: 10px; margin-bottom: 20px;'>
+        <h2 style='color: white; margin: 0;'>Cocred</h2>
+        <p style='color: white; margin: 0;'>Análise consolidada de campanhas</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.link_button("📊 ABRIR EXCEL ONLINE", EXCEL_ONLINE_URL, use_container_width=True, type="primary")
+    
+    st.markdown("---")
+    st.subheader("📥 Carregar Dados")
+    
+    if st.button("🔄 Carregar Planilha", use_container_width=True):
+        with st.spinner("Conectando ao SharePoint..."):
+            token = get_access_token()
+            if token:
+                item_em_cache = (
+                    any(c[:2] == (DRIVE_ID, ITEM_ID) for c in store.chaves())
+                    or get_snapshot_store().tem_item(DRIVE_ID, ITEM_ID)
+                )
+                if item_em_cache:
+                    # Consulta só os metadados primeiro: se a versão já está em memória
+                    # não há download nem leitura da planilha
+                    metadata, file_bytes = get_file_metadata(), None
+                else:
+                    # Carga a frio: metadados e conteúdo são baixados em paralelo
+                    with st.spinner("Baixando dados..."):
+                        metadata, file_bytes = download_metadata_e_excel(barra_progresso_download())
+                chave = chave_dataset(metadata)
+
+                if chave == st.session_state.dataset_key and store.obter(chave) is not None:
+                    st.session_state.file_metadata = metadata
+                    st.info("✅ A planilha não mudou desde o último carregamento.")
+                elif item_em_cache or file_bytes is not None:
+                    with st.spinner("Baixando dados..."):
+                        df_carregado = store.obter_ou_carregar(
+                            chave,
+                            lambda: carregar_planilha(chave, metadata, file_bytes),
+                            st.session_state.sessao_id
+                        )
+                        if df_carregado is not None:
+                            chave_anterior = st.session_state.dataset_key
+                            if chave_anterior is not None and chave_anterior != chave:
+                                # Planilha que só cresceu: agrega apenas as linhas novas
+                                aproveitar_versao_anterior(chave_anterior, chave, df_carregado)
+                                liberar_versao(chave_anterior)
+
+                            st.session_state.dataset_key = chave
+                            if metadata:
+                                st.session_state.file_metadata = metadata
+
+                            st.success(f"✅ Dados carregados! {len(df_carregado)} linhas")
+                            st.rerun()
+    
+    if st.session_state.file_metadata:
+        st.markdown("---")
+        st.subheader("ℹ️ Info")
+        meta = st.session_state.file_metadata
+        
+        modified = meta.get('lastModifiedDateTime', 'N/A')
+        if modified != 'N/A':
+            modified = datetime.fromisoformat(modified.replace('Z', '+00:00')).strftime('%d/%m/%Y %H:%M')
+        
+        st.write(f"**Arquivo:** {meta.get('name', 'N/A')}")
+        st.write(f"**Modificado:** {modified}")
+        if df is not None:
+            st.write(f"**Linhas:** {len(df)}")
+            st.write(f"**Colunas:** {len(df.columns)}")
+
+        cache = store.estatisticas()
+        st.caption(f"Cache compartilhado: {cache['versoes']} versão(ões) • {cache['bytes'] / 1024 / 1024:.1f} MB • {cache['sessoes']} sessão(ões)")
+
+        with st.expander("🔧 Conexão com o Graph"):
+            estatisticas_graph = get_graph_client().estatisticas()
+            if estatisticas_graph:
+                st.dataframe(pd.DataFrame(estatisticas_graph).fillna(0).astype(int), use_container_width=True)
+            else:
+                st.caption("Nenhuma chamada registrada.")
+    
+    if df is not None:
+        st.markdown("---")
+        if st.button("🗑️ Limpar", use_container_width=True):
+            liberar_versao(st.session_state.dataset_key)
+            st.session_state.dataset_key = None
+            st.session_state.file_metadata = None
+            st.session_state.exportacoes.clear()
+            st.rerun()
+
+# ========== ÁREA PRINCIPAL ==========
+if df is not None:
+    papeis = store.derivado(st.session_state.dataset_key, 'papeis', lambda: resolver_papeis(df))
+    indice = store.derivado(st.session_state.dataset_key, 'indice_filtros', lambda: IndiceFiltros(df, papeis))
+    cubo = store.derivado(st.session_state.dataset_key, 'cubo_kpis', lambda: CuboKPIs(df, papeis, indice))
+    
+    # Agora apenas o dashboard de métricas, sem abas
+    dashboard_metricas(df, papeis, indice, cubo)
+
+else:
+    # Tela inicial
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.markdown(f"""
+        <div style='background-color: white; padding: 40px; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <span style='font-size: 60px;'>👋</span>
+            <h3 style='color: {CORES['verde_escuro']};'>Bem-vindo ao Dashboard Cocred</h3>
+            <p style='color: gray;'>Clique em 'Carregar Planilha' no menu lateral para começar.</p>
+            <div style='margin-top: 20px;'>
+                <span style='background-color: {CORES['turquesa']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Turquesa</span>
+                <span style='background-color: {CORES['verde_claro']}; color: {CORES['verde_escuro']}; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Verde Claro</span>
+                <span style='background-color: {CORES['verde_escuro']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Verde Escuro</span>
+                <span style='background-color: {CORES['roxo']}; color: white; padding: 5px 15px; border-radius: 20px; margin: 0 5px;'>Roxo</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, {CORES['turquesa']}20, {CORES['roxo']}20); padding: 40px; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <span style='font-size: 60px;'>📊</span>
+            <h3 style='color: {CORES['roxo']};'>Editar Planilha</h3>
+            <p style='color: {CORES['texto_escuro']};'>Use o Excel Online para fazer alterações diretamente no navegador.</p>
+            <div style='margin-top: 20px;'>
+                <a href='{EXCEL_ONLINE_URL}' target='_blank' style='background-color: {CORES['turquesa']}; color: white; padding: 10px 30px; border-radius: 5px; text-decoration: none; font-weight: bold;'>Abrir Excel Online</a>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+# ========== RODAPÉ ==========
+st.markdown("---")
+st.markdown(f"""
+<div class='footer'>
+    <span>🕒 {datetime.now().strftime('%d/%m/%Y %H:%M')}</span> • 
+    <span style='color: {CORES['turquesa']};'>Cocred</span> • 
+    <span style='color: {CORES['roxo']};'>Visão Geral</span> • 
+    <span>v7.1 - Com Exportação</span>
+</div>
 """, unsafe_allow_html=True)
\ No newline at end of file
@@ -1,24 +1,22 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import io
 import msal
 import requests
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from fpdf import FPDF
-import tempfile
-import os
+import uuid
+from collections import OrderedDict
 
-# ========== FUNÇÃO PARA FORMATAR PERCENTUAIS ==========
-def formatar_percentual(valor):
-    """Formata qualquer valor como percentual arredondado"""
-    if pd.isna(valor) or valor == 0:
-        return "0%"
-    # Converte para percentual (0.15 → 15)
-    percentual = valor * 100
-    # Arredonda para inteiro
-    return f"{round(percentual)}%"
+from agregacoes import CuboKPIs, IndiceFiltros, SeriesTemporais, assinatura_linhas, linhas_acrescentadas
+from datas import converter_datas, detectar_colunas_data
+from esquema import resolver_papeis
+from exportacoes import FilaExportacoes
+from formatacao import formatar_percentuais
+import paginacao
+from relatorios import exportar_excel_completo, gerar_relatorio_executivo
 
 # ========== CORES OFICIAIS DA COCRED ==========
 CORES = {
@@ -51,6 +49,10 @@ PLOTLY_TEMA = {
     }
 }
 
+# Copy-on-write: seleções de linhas/colunas e assign compartilham os dados com a
+# planilha da sessão e só copiam o que for de fato alterado
+pd.options.mode.copy_on_write = True
+
 # ========== CONFIGURAÇÕES DO AZURE ==========
 TENANT_ID = st.secrets["TENANT_ID"]
 CLIENT_ID = st.secrets["CLIENT_ID"]
@@ -58,6 +60,18 @@ CLIENT_SECRET = st.secrets["CLIENT_SECRET"]
 DRIVE_ID = st.secrets["DRIVE_ID"]
 ITEM_ID = st.secrets["ITEM_ID"]
 
+# Quantos arquivos exportados (PDF/Excel/CSV) cada sessão mantém prontos para download
+MAX_EXPORTACOES_SESSAO = 6
+
+# Exportações geradas ao mesmo tempo em segundo plano (somando todas as sessões)
+MAX_EXPORTACOES_SIMULTANEAS = 2
+
+# Intervalo (segundos) entre as atualizações do progresso de uma exportação
+INTERVALO_PROGRESSO_EXPORTACAO = 1
+
+# Opções de linhas por página da Tabela Geral (só a página visível é enviada ao navegador)
+TAMANHOS_PAGINA = [50, 100, 250, 500]
+
 # Link direto para o Excel Online
 EXCEL_ONLINE_URL = "https://agenciaideatore-my.sharepoint.com/:x:/r/personal/cristini_cordesco_ideatoreamericas_com/_layouts/15/Doc.aspx?sourcedoc=%7B198c1ffa-cc36-4faa-a79f-f041003b786a%7D&action=default"
 # ========================================
@@ -141,58 +155,12 @@ def get_file_metadata(token):
         return None
 
 # ========== FUNÇÕES PARA EXPORTAÇÃO DE RELATÓRIOS ==========
-def gerar_relatorio_pdf(df):
-    """Gera um relatório PDF com análises"""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Título
-    pdf.set_fill_color(0, 174, 157)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font('Arial', 'B', 20)
-    pdf.cell(0, 20, 'Relatório Cocred', 0, 1, 'C', 1)
-    pdf.ln(10)
-    
-    # Data
-    pdf.set_text_color(0, 54, 65)
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(0, 10, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 1)
-    pdf.ln(5)
-    
-    # Estatísticas gerais
-    pdf.set_font('Arial', 'B', 12)
-    pdf.set_text_color(0, 174, 157)
-    pdf.cell(0, 10, 'Resumo Geral:', 0, 1)
-    pdf.set_font('Arial', '', 10)
-    pdf.set_text_color(0, 0, 0)
-    pdf.cell(0, 10, f'Total de registros: {len(df)}', 0, 1)
-    
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-    for col in numeric_cols[:3]:
-        pdf.cell(0, 10, f'Total {col}: {df[col].sum():,.2f}', 0, 1)
-        pdf.cell(0, 10, f'Média {col}: {df[col].mean():,.2f}', 0, 1)
-    
-    return pdf
-
-def exportar_excel_completo(df):
-    """Exporta todos os dados e análises para Excel"""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Dados Brutos', index=False)
-        
-        campaign_cols = [col for col in df.columns if any(x in col.lower() for x in ['campanha', 'campaign'])]
-        if campaign_cols:
-            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-            resumo = df.groupby(campaign_cols[0])[numeric_cols].sum()
-            resumo.to_excel(writer, sheet_name='Resumo por Campanha')
-        
-        stats = df.describe()
-        stats.to_excel(writer, sheet_name='Estatísticas')
-    
-    return output
+@st.cache_resource
+def get_fila_exportacoes():
+    return FilaExportacoes(max_simultaneos=MAX_EXPORTACOES_SIMULTANEAS)
 
 # ========== DASHBOARD DE MÉTRICAS ==========
-def dashboard_metricas(df):
+def dashboard_metricas(df, papeis, indice, cubo):
     """Dashboard com filtros, cards de métricas, descrições e tabela geral"""
     
     st.markdown("### 🔍 FILTROS")
@@ -201,99 +169,43 @@ def dashboard_metricas(df):
     col_f1, col_f2, col_f3, col_f4 = st.columns(4)
     
     with col_f1:
-        # Busca por "Ano da Campanha"
-        possiveis_ano = [
-            'Ano da Campanha',
-            'Ano', 'ano', 'ANO',
-            'Ano da campanha', 'ano da campanha'
-        ]
-        
-        col_ano = None
-        for nome in possiveis_ano:
-            if nome in df.columns:
-                col_ano = nome
-                break
-        
-        if col_ano:
-            anos = ['Todos'] + sorted(df[col_ano].astype(str).unique().tolist())
-            ano_sel = st.selectbox("Ano", anos, key="filtro_ano")
-        else:
-            ano_sel = st.selectbox("Ano", ['Todos'], key="filtro_ano")
+        anos = ['Todos'] + indice.opcoes('ano')
+        ano_sel = st.selectbox("Ano", anos, key="filtro_ano")
+        if 'ano' not in indice:
             st.caption("⚠️ Coluna 'Ano da Campanha' não encontrada")
     
     with col_f2:
-        camp_cols = [col for col in df.columns if any(x in col.lower() for x in ['campanha', 'campaign'])]
-        if camp_cols:
-            camps = ['Todas'] + df[camp_cols[0]].unique().tolist()
-            camp_sel = st.selectbox("Campanha", camps, key="filtro_campanha")
-        else:
-            camp_sel = st.selectbox("Campanha", ['Todas'], key="filtro_campanha")
+        camps = ['Todas'] + indice.opcoes('campanha')
+        camp_sel = st.selectbox("Campanha", camps, key="filtro_campanha")
     
     with col_f3:
-        if 'Meio' in df.columns:
-            meios = ['Todos'] + df['Meio'].unique().tolist()
-            meio_sel = st.selectbox("Meio", meios, key="filtro_meio")
-        else:
-            meio_sel = st.selectbox("Meio", ['Todos'], key="filtro_meio")
+        meios = ['Todos'] + indice.opcoes('meio')
+        meio_sel = st.selectbox("Meio", meios, key="filtro_meio")
     
     with col_f4:
-        veic_col = None
-        if 'Veículo' in df.columns:
-            veic_col = 'Veículo'
-        elif 'Veiculo' in df.columns:
-            veic_col = 'Veiculo'
-        
-        if veic_col:
-            veics = ['Todos'] + df[veic_col].unique().tolist()
-            veic_sel = st.selectbox("Veículo", veics, key="filtro_veiculo")
-        else:
-            veic_sel = st.selectbox("Veículo", ['Todos'], key="filtro_veiculo")
-    
-    # Aplicar filtros
-    df_filtrado = df.copy()
-    
-    if col_ano and ano_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado[col_ano].astype(str) == ano_sel]
-    
-    if camp_cols and camp_sel != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado[camp_cols[0]] == camp_sel]
-    
-    if 'Meio' in df.columns and meio_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['Meio'] == meio_sel]
-    
-    if veic_col and veic_sel != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado[veic_col] == veic_sel]
+        veics = ['Todos'] + indice.opcoes('veiculo')
+        veic_sel = st.selectbox("Veículo", veics, key="filtro_veiculo")
+    
+    # Aplicar filtros: posições das linhas selecionadas (None = todas)
+    selecoes = {
+        'ano': None if ano_sel == 'Todos' else ano_sel,
+        'campanha': None if camp_sel == 'Todas' else camp_sel,
+        'meio': None if meio_sel == 'Todos' else meio_sel,
+        'veiculo': None if veic_sel == 'Todos' else veic_sel,
+    }
+    posicoes = indice.filtrar(selecoes)
+    df_filtrado = df if posicoes is None else df.iloc[posicoes]
     
     st.markdown("---")
     
     # ========== BIG NUMBERS ==========
     st.markdown("### 📊 BIG NUMBERS")
     
-    # Busca por IMPACTO
-    possiveis_impacto = [
-        'Impacto (impressões e entrega de email)',
-        'Impacto', 'impacto', 'IMPACTO',
-        'Impressões', 'impressões', 'IMPRESSÕES',
-        'Impressoes', 'impressoes', 'IMPRESSOES',
-        'Visualizações', 'visualizações', 'VISUALIZAÇÕES',
-        'Visualizacoes', 'visualizacoes', 'VISUALIZACOES',
-        'views', 'Views', 'VIEWS',
-        'alcance', 'Alcance', 'ALCANCE'
-    ]
-    
-    col_impacto = None
-    for nome in possiveis_impacto:
-        if nome in df_filtrado.columns:
-            col_impacto = nome
-            #st.success(f"✅ Coluna de IMPACTO encontrada: '{col_impacto}'")
-            break
-    
-    col_invest = next((col for col in ['Investimento', 'investimento', 'INVESTIMENTO', 'gasto', 'custo'] if col in df_filtrado.columns), None)
-    col_leads = next((col for col in ['Leads', 'leads', 'LEADS', 'conversoes', 'conversões'] if col in df_filtrado.columns), None)
-    
-    impacto = df_filtrado[col_impacto].sum() if col_impacto else 0
-    investimento = df_filtrado[col_invest].sum() if col_invest else 0
-    leads = df_filtrado[col_leads].sum() if col_leads else 0
+    # Somas vindas do cubo pré-agregado; CPM e CPL derivam delas
+    totais = cubo.totais(selecoes)
+    impacto = totais['impacto']
+    investimento = totais['investimento']
+    leads = totais['leads']
     
     cpm = (investimento / impacto * 1000) if impacto > 0 else 0
     cpl = (investimento / leads) if leads > 0 else 0
@@ -385,29 +297,63 @@ def dashboard_metricas(df):
     # ========== TABELA GERAL ==========
     st.markdown("### 📋 TABELA GERAL")
     
-    # Formata colunas de porcentagem na tabela
-    df_exibicao = df_filtrado.copy()
+    # Planilha inteira; os filtros entram como posições das linhas
+    df_tabela = df
     
-    # Detecta colunas que parecem ser taxas/percentuais
-    for col in df_exibicao.select_dtypes(include=['float64', 'int64']).columns:
-        # Se a coluna tem valores entre 0 e 1 (provável percentual)
-        if df_exibicao[col].min() >= 0 and df_exibicao[col].max() <= 1:
-            # Verifica se o nome da coluna sugere taxa
-            if any(palavra in col.lower() for palavra in ['taxa', 'percentual', 'porcentagem', 'ctr', 'conversão', 'abertura', 'clique']):
-                df_exibicao[col] = df_exibicao[col].apply(lambda x: formatar_percentual(x))
+    # Busca, ordenação e paginação no servidor: só a página visível vai para o navegador
+    col_t1, col_t2, col_t3, col_t4 = st.columns([3, 2, 1, 1])
     
-    st.dataframe(df_exibicao, use_container_width=True, height=400)
+    with col_t1:
+        termo = st.text_input("Buscar", key="tabela_busca", placeholder="Texto em qualquer coluna de texto")
     
-    csv = df_filtrado.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="📥 Download CSV (filtrado)",
-        data=csv,
-        file_name=f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-        mime="text/csv"
+    with col_t2:
+        ordenar_por = st.selectbox("Ordenar por", ['(ordem da planilha)'] + df_tabela.columns.tolist(), key="tabela_ordem")
+    
+    with col_t3:
+        sentido = st.selectbox("Sentido", ['Crescente', 'Decrescente'], key="tabela_sentido")
+    
+    with col_t4:
+        tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1, key="tabela_tamanho")
+    
+    linhas_tabela = np.arange(len(df_tabela)) if posicoes is None else posicoes
+    linhas_tabela = paginacao.buscar(df_tabela, linhas_tabela, termo)
+    if ordenar_por != '(ordem da planilha)':
+        chave = derivado(('ordenacao', ordenar_por), lambda: paginacao.chave_ordenacao(df_tabela[ordenar_por]))
+        linhas_tabela = paginacao.ordenar(linhas_tabela, chave, sentido == 'Crescente')
+    
+    # Filtros, busca ou ordenação novos voltam para a primeira página
+    consulta = (tuple(selecoes.values()), termo, ordenar_por, sentido, tamanho_pagina, df_tabela.shape)
+    if st.session_state.get('tabela_consulta') != consulta:
+        st.session_state.tabela_consulta = consulta
+        st.session_state.tabela_pagina = 1
+    
+    total_paginas = max(1, -(-len(linhas_tabela) // tamanho_pagina))
+    numero_pagina = st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="tabela_pagina")
+    linhas_pagina, total_paginas = paginacao.pagina(linhas_tabela, numero_pagina, tamanho_pagina)
+    
+    # Colunas de taxa (decididas uma vez por versão) exibidas como percentual
+    df_exibicao, config_colunas = formatar_percentuais(df_tabela.iloc[linhas_pagina], papeis['percentuais'])
+    
+    st.dataframe(df_exibicao, use_container_width=True, height=400, column_config=config_colunas)
+    
+    inicio = (numero_pagina - 1) * tamanho_pagina
+    st.caption(
+        f"Linhas {inicio + 1 if len(linhas_pagina) else 0}–{inicio + len(linhas_pagina)} "
+        f"de {len(linhas_tabela)} · página {numero_pagina} de {total_paginas}"
     )
+    
+    def preparar_csv():
+        def gerar(progresso):
+            progresso(0.1, "Gravando o CSV...")
+            csv = df_filtrado.to_csv(index=False).encode('utf-8')
+            return f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv", csv
+        return gerar
+    
+    # Só gera quando pedido (em segundo plano); a mesma visão já gerada é reaproveitada
+    painel_exportacao('csv', selecoes, preparar_csv, 'CSV (filtrado)', "text/csv", chave_widget='csv_filtrado')
 
 # ========== ANÁLISE TEMPORAL ==========
-def analise_temporal(df):
+def analise_temporal(df, papeis):
     """Análise ao longo do tempo - VERSÃO CORRIGIDA PARA 'mês da análise'"""
     st.subheader("📈 Análise Temporal")
     
@@ -415,28 +361,13 @@ def analise_temporal(df):
     with st.expander("📋 Ver colunas disponíveis"):
         st.write("Colunas no DataFrame:", df.columns.tolist())
     
-    # Identifica colunas de data de forma mais abrangente
-    date_cols = []
+    # Colunas de data e seus formatos, detectados uma vez por carga da planilha
+    formatos_data = derivado('colunas_data', lambda: detectar_colunas_data(df, papeis))
+    date_cols = list(formatos_data)
     
-    # 1. Primeiro, procura especificamente por "mês da análise"
-    if 'mês da análise' in df.columns:
-        date_cols.append('mês da análise')
+    if 'mês da análise' in formatos_data:
         st.success("✅ Coluna 'mês da análise' encontrada!")
     
-    # 2. Depois, procura por outras colunas que possam ser datas
-    for col in df.columns:
-        if col not in date_cols:  # Evita duplicar
-            # Verifica se o nome da coluna sugere data
-            if any(x in col.lower() for x in ['data', 'date', 'mês', 'mes', 'ano', 'year']):
-                date_cols.append(col)
-            # Tenta converter para datetime
-            else:
-                try:
-                    pd.to_datetime(df[col])
-                    date_cols.append(col)
-                except:
-                    pass
-    
     if not date_cols:
         st.error("""
         ⚠️ Nenhuma coluna de data encontrada!
@@ -458,7 +389,7 @@ def analise_temporal(df):
         return
     
     # Colunas numéricas
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+    numeric_cols = papeis['numericas']
     
     if not numeric_cols:
         st.warning("Não há colunas numéricas para análise temporal.")
@@ -476,68 +407,34 @@ def analise_temporal(df):
         metrica = st.selectbox("Métrica a analisar:", numeric_cols, key="temp_metrica")
     
     with col3:
-        periodo = st.selectbox("Agrupar por:", ['Mês', 'Trimestre', 'Semestre', 'Ano'])
-    
-    # Prepara dados
-    df_temp = df.copy()
+        periodo = st.selectbox("Agrupar por:", SeriesTemporais.GRANULARIDADES)
     
-    # Tenta converter a coluna selecionada para datetime
+    # Coluna de datas convertida uma vez por coluna e carga da planilha
     try:
-        # Se for 'mês da análise' no formato "Janeiro/2024" ou similar
-        if data_col == 'mês da análise':
-            # Tenta diferentes formatos comuns
-            df_temp['data_analise'] = pd.to_datetime(df_temp[data_col], errors='coerce')
-            
-            # Se falhar, tenta extrair mês e ano de texto
-            if df_temp['data_analise'].isna().all():
-                # Exemplo: "Janeiro/2024" -> extrai mês e ano
-                df_temp['mes_extraido'] = df_temp[data_col].str.extract(r'([A-Za-zç]+)')
-                df_temp['ano_extraido'] = df_temp[data_col].str.extract(r'(\d{4})')
-                
-                # Mapeia nomes de meses para números
-                meses_map = {
-                    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
-                    'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
-                    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
-                }
-                
-                df_temp['mes_num'] = df_temp['mes_extraido'].str.lower().map(meses_map)
-                df_temp['data_analise'] = pd.to_datetime(
-                    df_temp['ano_extraido'].astype(str) + '-' + 
-                    df_temp['mes_num'].astype(str) + '-01', 
-                    errors='coerce'
-                )
-        else:
-            df_temp['data_analise'] = pd.to_datetime(df_temp[data_col], errors='coerce')
-        
-        # Remove linhas com data inválida
-        df_temp = df_temp.dropna(subset=['data_analise'])
-        
-        if len(df_temp) == 0:
-            st.error("Não foi possível converter a coluna selecionada para data.")
-            return
-            
+        datas = derivado(
+            ('data_analise', data_col),
+            lambda: converter_datas(df[data_col], formatos_data.get(data_col))
+        )
     except Exception as e:
         st.error(f"Erro ao processar datas: {str(e)}")
         return
     
-    # Agrupa por período
-    if periodo == 'Mês':
-        df_temp['periodo'] = df_temp['data_analise'].dt.to_period('M').astype(str)
-        titulo = f"Evolução Mensal de {metrica}"
-    elif periodo == 'Trimestre':
-        df_temp['periodo'] = df_temp['data_analise'].dt.to_period('Q').astype(str)
-        titulo = f"Evolução Trimestral de {metrica}"
-    elif periodo == 'Semestre':
-        df_temp['periodo'] = df_temp['data_analise'].dt.to_period('2Q').astype(str)
-        titulo = f"Evolução Semestral de {metrica}"
-    else:  # Ano
-        df_temp['periodo'] = df_temp['data_analise'].dt.year
-        titulo = f"Evolução Anual de {metrica}"
-    
-    # Agrega
-    temporal = df_temp.groupby('periodo')[metrica].sum().reset_index()
-    temporal = temporal.sort_values('periodo')
+    # Somas de todas as métricas por mês, trimestre, semestre e ano, uma vez por coluna de data
+    series = derivado(('series_temporais', data_col), lambda: SeriesTemporais(datas, df, numeric_cols))
+    
+    if series.mensal.empty:
+        st.error("Não foi possível converter a coluna selecionada para data.")
+        return
+    
+    titulo = {
+        'Mês': f"Evolução Mensal de {metrica}",
+        'Trimestre': f"Evolução Trimestral de {metrica}",
+        'Semestre': f"Evolução Semestral de {metrica}",
+        'Ano': f"Evolução Anual de {metrica}",
+    }[periodo]
+    
+    # Períodos em ordem cronológica (índice Period), com o rótulo na coluna 'periodo'
+    temporal = series.tabela(periodo, metrica)
     
     # ========== GRÁFICO PRINCIPAL ==========
     fig = px.line(
@@ -624,14 +521,19 @@ def analise_temporal(df):
 
 # ========== DEMAIS FUNÇÕES DE ANÁLISE ==========
 
-def analise_comparativa_campanhas(df):
+def resumir_por_campanha(df, campaign_col, metrica):
+    """Total, média e contagem de ``metrica`` por campanha, sem ordenar"""
+    resumo = df.groupby(campaign_col, observed=True, sort=False)[metrica].agg(['sum', 'mean', 'count']).round(2)
+    resumo.columns = ['Total', 'Média', 'Contagem']
+    return resumo
+
+def analise_comparativa_campanhas(df, papeis):
     """Comparativo entre campanhas"""
     st.subheader("📊 Comparativo entre Campanhas")
     
-    campaign_cols = [col for col in df.columns if any(x in col.lower() for x in ['campanha', 'campaign', 'nome', 'name'])]
-    campaign_col = campaign_cols[0] if campaign_cols else df.columns[0]
+    campaign_col = papeis['campanha'] or papeis['nome'] or df.columns[0]
     
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+    numeric_cols = papeis['numericas']
     
     if not numeric_cols:
         st.warning("Não há colunas numéricas para análise comparativa.")
@@ -646,23 +548,20 @@ def analise_comparativa_campanhas(df):
     with col2:
         top_n = st.slider("Mostrar top N campanhas:", 5, 20, 10)
     
-    comparativo = df.groupby(campaign_col).agg({
-        metrica_principal: ['sum', 'mean', 'count']
-    }).round(2)
-    
-    comparativo.columns = ['Total', 'Média', 'Contagem']
-    comparativo = comparativo.sort_values('Total', ascending=False).head(top_n)
+    # O agrupamento é feito uma vez por métrica e versão da planilha; o slider só escolhe os N maiores
+    resumo = derivado(
+        ('comparativo_campanhas', campaign_col, metrica_principal),
+        lambda: resumir_por_campanha(df, campaign_col, metrica_principal)
+    )
+    comparativo = resumo.nlargest(top_n, 'Total')
     
     st.markdown(f"### Top {top_n} Campanhas por {metrica_principal}")
     
-    # Formata colunas que podem ser percentuais no comparativo
-    df_exibicao = comparativo.copy()
-    for col in df_exibicao.select_dtypes(include=['float64', 'int64']).columns:
-        if df_exibicao[col].min() >= 0 and df_exibicao[col].max() <= 1:
-            if any(palavra in col.lower() for palavra in ['taxa', 'percentual', 'porcentagem', 'ctr', 'conversão']):
-                df_exibicao[col] = df_exibicao[col].apply(lambda x: formatar_percentual(x))
+    # Para métricas de taxa a média por campanha continua sendo um percentual
+    percentuais = ['Média'] if metrica_principal in papeis['percentuais'] else []
+    df_exibicao, config_colunas = formatar_percentuais(comparativo, percentuais)
     
-    st.dataframe(df_exibicao, use_container_width=True)
+    st.dataframe(df_exibicao, use_container_width=True, column_config=config_colunas)
     
     fig = px.bar(
         comparativo.reset_index(),
@@ -687,7 +586,7 @@ def analise_comparativa_campanhas(df):
         </div>
         """, unsafe_allow_html=True)
 
-def tabela_dinamica_interativa(df):
+def tabela_dinamica_interativa(df, papeis):
     """Tabela dinâmica configurável"""
     st.subheader("🔄 Tabela Dinâmica Interativa")
     
@@ -697,8 +596,8 @@ def tabela_dinamica_interativa(df):
     </div>
     """, unsafe_allow_html=True)
     
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+    categorical_cols = papeis['categoricas']
+    numeric_cols = papeis['numericas']
     
     if not categorical_cols or not numeric_cols:
         st.warning("Precisa de colunas categóricas e numéricas para criar tabela dinâmica.")
@@ -727,15 +626,13 @@ def tabela_dinamica_interativa(df):
         
         st.markdown("### Resultado")
         
-        # Formata percentuais na tabela dinâmica
-        df_pivot_exibicao = pivot.copy()
-        if isinstance(df_pivot_exibicao, pd.DataFrame):
-            for col in df_pivot_exibicao.select_dtypes(include=['float64', 'int64']).columns:
-                if df_pivot_exibicao[col].min() >= 0 and df_pivot_exibicao[col].max() <= 1:
-                    if any(palavra in str(col).lower() for palavra in ['taxa', 'percentual', 'porcentagem', 'ctr', 'conversão']):
-                        df_pivot_exibicao[col] = df_pivot_exibicao[col].apply(lambda x: formatar_percentual(x))
+        # Formata percentuais na tabela dinâmica: média, máximo e mínimo de uma taxa continuam sendo taxas
+        percentuais = []
+        if not colunas and valores in papeis['percentuais'] and agg_func in ('Média', 'Máximo', 'Mínimo'):
+            percentuais = [valores]
+        df_pivot_exibicao, config_colunas = formatar_percentuais(pivot, percentuais)
         
-        st.dataframe(df_pivot_exibicao, use_container_width=True, height=400)
+        st.dataframe(df_pivot_exibicao, use_container_width=True, height=400, column_config=config_colunas)
         
         csv_pivot = pivot.to_csv().encode('utf-8')
         st.download_button(
@@ -745,7 +642,7 @@ def tabela_dinamica_interativa(df):
             mime="text/csv"
         )
 
-def exportar_relatorios(df):
+def exportar_relatorios(df, papeis, cubo):
     """Aba para exportação de relatórios"""
     st.subheader("📤 Exportar Relatórios")
     
@@ -766,28 +663,15 @@ def exportar_relatorios(df):
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("📥 Gerar PDF", use_container_width=True):
-            with st.spinner("Gerando PDF..."):
-                try:
-                    pdf = gerar_relatorio_pdf(df)
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                        pdf.output(tmp_file.name)
-                        tmp_file_path = tmp_file.name
-                    
-                    with open(tmp_file_path, 'rb') as f:
-                        pdf_bytes = f.read()
-                    
-                    os.unlink(tmp_file_path)
-                    
-                    st.download_button(
-                        label="📥 Clique para baixar PDF",
-                        data=pdf_bytes,
-                        file_name=f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                        mime="application/pdf"
-                    )
-                except Exception as e:
-                    st.error(f"Erro ao gerar PDF: {str(e)}")
+        def preparar_pdf():
+            def gerar(progresso):
+                # Relatório executivo montado a partir do cubo de KPIs, direto em memória
+                pdf_bytes = gerar_relatorio_executivo(cubo, {}, progresso=progresso)
+                return f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf", pdf_bytes
+            return gerar
+        
+        # Esta aba exporta a planilha inteira (sem filtros)
+        painel_exportacao('pdf', {}, preparar_pdf, 'PDF', "application/pdf")
     
     with col2:
         st.markdown(f"""
@@ -798,16 +682,16 @@ def exportar_relatorios(df):
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("📥 Gerar Excel", use_container_width=True):
-            with st.spinner("Gerando Excel..."):
-                excel_bytes = exportar_excel_completo(df)
-                
-                st.download_button(
-                    label="📥 Clique para baixar Excel",
-                    data=excel_bytes.getvalue(),
-                    file_name=f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+        def preparar_excel():
+            def gerar(progresso):
+                excel_bytes = exportar_excel_completo(df, papeis['campanha'], progresso)
+                return f"relatorio_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx", excel_bytes.getvalue()
+            return gerar
+        
+        painel_exportacao(
+            'excel', {}, preparar_excel, 'Excel',
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
     
     with col3:
         st.markdown(f"""
@@ -818,14 +702,14 @@ def exportar_relatorios(df):
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("📥 Gerar CSV", use_container_width=True):
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Clique para baixar CSV",
-                data=csv,
-                file_name=f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                mime="text/csv"
-            )
+        def preparar_csv():
+            def gerar(progresso):
+                progresso(0.1, "Gravando o CSV...")
+                csv = df.to_csv(index=False).encode('utf-8')
+                return f"dados_cocred_{datetime.now().strftime('%Y%m%d_%H%M')}.csv", csv
+            return gerar
+        
+        painel_exportacao('csv', {}, preparar_csv, 'CSV', "text/csv")
     
     with st.expander("🔍 Preview dos dados que serão exportados"):
         st.dataframe(df.head(10), use_container_width=True)
@@ -837,6 +721,121 @@ if 'file_metadata' not in st.session_state:
     st.session_state.file_metadata = None
 if 'token' not in st.session_state:
     st.session_state.token = None
+if 'derivados' not in st.session_state:
+    st.session_state.derivados = {}
+if 'exportacoes' not in st.session_state:
+    st.session_state.exportacoes = OrderedDict()
+if 'versao_dados' not in st.session_state:
+    st.session_state.versao_dados = None
+
+
+def derivado(nome, calcular):
+    """Resultado de ``calcular()`` guardado na sessão até a planilha ser recarregada"""
+    if nome not in st.session_state.derivados:
+        st.session_state.derivados[nome] = calcular()
+    return st.session_state.derivados[nome]
+
+
+def aproveitar_carga_anterior(df_anterior, anteriores, df):
+    """Derivados da nova carga, estendidos só com as linhas novas quando a planilha apenas cresceu.
+
+    As cargas são comparadas pelo hash de cada linha. Índice de filtros, cubo,
+    datas convertidas e séries temporais da carga anterior recebem só as
+    linhas acrescentadas ao fim; qualquer edição, remoção ou mudança nas
+    colunas (ou nos formatos de data) faz tudo ser recalculado sob demanda.
+    """
+    if df_anterior is None or list(df_anterior.columns) != list(df.columns):
+        return {}
+    assinatura_anterior = anteriores.get('assinatura_linhas')
+    if assinatura_anterior is None:
+        assinatura_anterior = assinatura_linhas(df_anterior)
+    derivados = {'assinatura_linhas': assinatura_linhas(df)}
+    inicio = linhas_acrescentadas(assinatura_anterior, derivados['assinatura_linhas'])
+    papeis = resolver_papeis(df)
+    if inicio is None or papeis != anteriores.get('papeis'):
+        return derivados
+    derivados['papeis'] = papeis
+
+    if 'indice_filtros' in anteriores:
+        indice, remapeamentos = anteriores['indice_filtros'].estendido(df, inicio)
+        derivados['indice_filtros'] = indice
+        if 'cubo_kpis' in anteriores:
+            derivados['cubo_kpis'] = anteriores['cubo_kpis'].estendido(df, papeis, indice, inicio, remapeamentos)
+
+    if 'colunas_data' not in anteriores:
+        return derivados
+    formatos_data = detectar_colunas_data(df, papeis)
+    if formatos_data != anteriores['colunas_data']:
+        return derivados
+    derivados['colunas_data'] = formatos_data
+    novas = df.iloc[inicio:]
+    for nome, datas in anteriores.items():
+        if isinstance(nome, tuple) and nome[0] == 'data_analise':
+            datas_novas = converter_datas(novas[nome[1]], formatos_data.get(nome[1]))
+            derivados[nome] = pd.concat((datas, datas_novas))
+            if ('series_temporais', nome[1]) in anteriores:
+                series = anteriores[('series_temporais', nome[1])]
+                derivados[('series_temporais', nome[1])] = series.estendida(datas_novas, novas)
+    return derivados
+
+
+def obter_exportacao(formato, selecoes, preparar=None):
+    """Trabalho de exportação (ver ``exportacoes.Trabalho``) dos filtros atuais, até a planilha ser recarregada.
+
+    Sem ``preparar`` só consulta; com ele envia o trabalho para a fila quando
+    ainda não existe (ou falhou). ``preparar()`` roda na thread do script e
+    retorna a função ``gerar(progresso)`` executada em segundo plano.
+    """
+    fila = get_fila_exportacoes()
+    cache = st.session_state.exportacoes
+    chave = (tuple(selecoes.items()), formato)
+    trabalho = fila.obter(cache[chave]) if chave in cache else None
+    if trabalho is not None and (preparar is None or trabalho.estado != 'erro'):
+        cache.move_to_end(chave)
+        return trabalho
+    if preparar is None:
+        cache.pop(chave, None)
+        return None
+
+    # A versão dos dados entra na chave da fila, que é compartilhada entre as sessões
+    trabalho = fila.enviar((st.session_state.versao_dados,) + chave, preparar())
+    cache[chave] = trabalho.id
+    cache.move_to_end(chave)
+    while len(cache) > MAX_EXPORTACOES_SESSAO:
+        cache.popitem(last=False)
+    return trabalho
+
+
+def acompanhar_exportacao(id_trabalho):
+    """Progresso do trabalho, atualizado sozinho (fragmento) até terminar"""
+    trabalho = get_fila_exportacoes().obter(id_trabalho)
+    if trabalho is None or not trabalho.em_andamento:
+        # Terminou: a página inteira é refeita para mostrar o download
+        st.rerun()
+    st.progress(trabalho.progresso, text=trabalho.mensagem)
+
+
+def painel_exportacao(formato, selecoes, preparar, rotulo, mime, chave_widget=None):
+    """Botão para gerar, progresso da geração em segundo plano e botão de download"""
+    chave_widget = chave_widget or formato
+    trabalho = obter_exportacao(formato, selecoes)
+    if trabalho is not None and trabalho.estado == 'erro':
+        st.error(f"Erro ao gerar {rotulo}: {trabalho.erro}")
+    if trabalho is None or trabalho.estado == 'erro':
+        if not st.button(f"📥 Gerar {rotulo}", key=f"btn_{chave_widget}", use_container_width=True):
+            return
+        trabalho = obter_exportacao(formato, selecoes, preparar)
+    
+    if trabalho.em_andamento:
+        st.fragment(acompanhar_exportacao, run_every=INTERVALO_PROGRESSO_EXPORTACAO)(trabalho.id)
+    elif trabalho.resultado:
+        st.download_button(
+            label=f"📥 Clique para baixar {rotulo}",
+            data=trabalho.resultado[1],
+            file_name=trabalho.resultado[0],
+            mime=mime,
+            key=f"download_{chave_widget}"
+        )
 
 # ========== MENU LATERAL ==========
 with st.sidebar:
@@ -861,7 +860,14 @@ with st.sidebar:
                 with st.spinner("Baixando dados..."):
                     file_bytes = download_excel(token)
                     if file_bytes:
-                        st.session_state.df = pd.read_excel(file_bytes)
+                        df_novo = pd.read_excel(file_bytes)
+                        # Planilha que só cresceu: agrega apenas as linhas novas
+                        st.session_state.derivados = aproveitar_carga_anterior(
+                            st.session_state.df, st.session_state.derivados, df_novo
+                        )
+                        st.session_state.df = df_novo
+                        st.session_state.exportacoes.clear()
+                        st.session_state.versao_dados = uuid.uuid4().hex
                         
                         metadata = get_file_metadata(token)
                         if metadata:
@@ -890,11 +896,16 @@ with st.sidebar:
         if st.button("🗑️ Limpar", use_container_width=True):
             st.session_state.df = None
             st.session_state.file_metadata = None
+            st.session_state.derivados = {}
+            st.session_state.exportacoes.clear()
             st.rerun()
 
 # ========== ÁREA PRINCIPAL ==========
 if st.session_state.df is not None:
     df = st.session_state.df
+    papeis = derivado('papeis', lambda: resolver_papeis(df))
+    indice = derivado('indice_filtros', lambda: IndiceFiltros(df, papeis))
+    cubo = derivado('cubo_kpis', lambda: CuboKPIs(df, papeis, indice))
     
     # TABS PRINCIPAIS
     tab1, tab2, tab3 = st.tabs([
@@ -904,7 +915,7 @@ if st.session_state.df is not None:
     ])
     
     with tab1:
-        dashboard_metricas(df)
+        dashboard_metricas(df, papeis, indice, cubo)
     
     with tab2:
         # Sub-abas de análises avançadas
@@ -916,16 +927,16 @@ if st.session_state.df is not None:
         ])
         
         with sub_tab1:
-            analise_comparativa_campanhas(df)
+            analise_comparativa_campanhas(df, papeis)
         
         with sub_tab2:
-            analise_temporal(df)
+            analise_temporal(df, papeis)
         
         with sub_tab3:
-            tabela_dinamica_interativa(df)
+            tabela_dinamica_interativa(df, papeis)
         
         with sub_tab4:
-            exportar_relatorios(df)
+            exportar_relatorios(df, papeis, cubo)
     
     with tab3:
         st.subheader("ℹ️ Sobre o Dashboard")
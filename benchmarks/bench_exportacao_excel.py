@@ -0,0 +1,76 @@
+"""Compara tempo e memória da exportação do Excel com pandas/openpyxl e em streaming.
+
+"pandas" é o ``ExcelWriter`` usado até aqui (modelo de células completo em
+memória); "streaming" é ``relatorios.exportar_excel_streaming`` (workbook
+write-only). Cada variante roda num processo próprio; o pico de RSS é medido
+acima da memória já ocupada pela planilha.
+
+Uso:
+    python benchmarks/bench_exportacao_excel.py [--linhas 100000]
+"""
+import argparse
+import gc
+import io
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from bench_memoria_filtros import _rss_mb, _zerar_pico_rss  # noqa: E402
+from dados_sinteticos import gerar_campanhas  # noqa: E402
+from relatorios import exportar_excel_streaming  # noqa: E402
+
+
+def exportar_pandas(df, col_campanha):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Dados Brutos', index=False)
+        numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+        df.groupby(col_campanha, observed=True)[numeric_cols].sum().to_excel(writer, sheet_name='Resumo por Campanha')
+        df.describe().to_excel(writer, sheet_name='Estatísticas')
+    return output
+
+
+def medir(variante, linhas, fila):
+    pd.options.mode.copy_on_write = True
+    df = gerar_campanhas(linhas).astype({'Campanha': 'category', 'Meio': 'category', 'Veículo': 'category'})
+    exportar = exportar_pandas if variante == 'pandas' else exportar_excel_streaming
+
+    gc.collect()
+    rss_base = _rss_mb('VmRSS')
+    _zerar_pico_rss()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    output = exportar(df, 'Campanha')
+    tempo = time.perf_counter() - inicio
+    pico_alocado = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    fila.put((variante, tempo, _rss_mb('VmHWM') - rss_base, pico_alocado / 1024 / 1024,
+              len(output.getvalue()) / 1024 / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    print(f"Exportando {args.linhas} linhas sintéticas (3 abas)\n")
+    print(f"{'':<10} {'tempo':>8} {'pico RSS':>10} {'pico alocado':>13} {'arquivo':>9}")
+    for variante in ('pandas', 'streaming'):
+        processo = contexto.Process(target=medir, args=(variante, args.linhas, fila))
+        processo.start()
+        nome, tempo, rss, alocado, tamanho = fila.get()
+        processo.join()
+        print(f"{nome:<10} {tempo:>7.1f}s {rss:>7.0f} MB {alocado:>10.0f} MB {tamanho:>6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Memória usada a cada rerun pelo filtro + Tabela Geral do dashboard, antes e depois do copy-on-write.
+
+"antes" reproduz o caminho antigo (``df.copy()``, máscaras encadeadas e
+``df_filtrado.copy()`` para formatar os percentuais como texto); "depois"
+usa o índice de filtros, o cubo de KPIs e copy-on-write, com os percentuais
+numéricos, como o app faz hoje.
+Cada variante roda num processo próprio: o pico de RSS é medido acima da
+memória já ocupada pela planilha e o pico de alocações por rerun vem do
+``tracemalloc``.
+
+Uso:
+    python benchmarks/bench_memoria_filtros.py [--linhas 500000] [--reruns 5]
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from agregacoes import CuboKPIs, IndiceFiltros  # noqa: E402
+from dados_sinteticos import gerar_campanhas  # noqa: E402
+from esquema import dtypes_dimensoes, resolver_papeis  # noqa: E402
+
+# Seleções simuladas: a primeira carga (sem filtro) e um filtro de ano
+SELECOES = [
+    {'ano': None, 'campanha': None, 'meio': None, 'veiculo': None},
+    {'ano': '2024', 'campanha': None, 'meio': None, 'veiculo': None},
+]
+
+
+def _formatar_taxas(df, papeis):
+    return {
+        col: df[col].apply(lambda x: f"{round(x * 100)}%")
+        for col in papeis['taxas']
+        if df[col].min() >= 0 and df[col].max() <= 1
+    }
+
+
+def rerun_antes(df, papeis, selecoes, **_):
+    df_filtrado = df.copy()
+    colunas = {'ano': papeis['ano'], 'campanha': papeis['campanha'], 'meio': papeis['meio'], 'veiculo': papeis['veiculo']}
+    for nome, valor in selecoes.items():
+        if valor is None:
+            continue
+        coluna = df_filtrado[colunas[nome]]
+        df_filtrado = df_filtrado[(coluna.astype(str) if nome == 'ano' else coluna) == valor]
+
+    totais = [df_filtrado[papeis[m]].sum() for m in ('impacto', 'investimento', 'leads')]
+
+    df_exibicao = df_filtrado.copy()
+    for col, valores in _formatar_taxas(df_exibicao, papeis).items():
+        df_exibicao[col] = valores
+    return totais, df_exibicao
+
+
+def rerun_depois(df, papeis, selecoes, indice, cubo):
+    posicoes = indice.filtrar(selecoes)
+    df_filtrado = df if posicoes is None else df.iloc[posicoes]
+
+    totais = cubo.totais(selecoes)
+
+    # Percentuais continuam numéricos (o % vem do column_config do st.dataframe)
+    df_exibicao = df_filtrado.copy(deep=False)
+    for col in papeis['percentuais']:
+        df_exibicao[col] = df_filtrado[col].mul(100).fillna(0)
+    return totais, df_exibicao
+
+
+def _zerar_pico_rss():
+    """Zera o pico de RSS do processo (Linux); sem suporte o pico vem do ru_maxrss"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+    except OSError:
+        pass
+
+
+def _rss_mb(campo):
+    """``VmRSS`` (atual) ou ``VmHWM`` (pico) do processo em MB"""
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def medir(variante, linhas, reruns, fila):
+    pd.options.mode.copy_on_write = variante == 'depois'
+    df = gerar_campanhas(linhas)
+    df = df.astype(dtypes_dimensoes(df.columns))
+    papeis = resolver_papeis(df)
+    extras = {}
+    if variante == 'depois':
+        extras['indice'] = IndiceFiltros(df, papeis)
+        extras['cubo'] = CuboKPIs(df, papeis, extras['indice'])
+    rerun = rerun_antes if variante == 'antes' else rerun_depois
+
+    gc.collect()
+    rss_base = _rss_mb('VmRSS')
+    _zerar_pico_rss()
+    picos = {}
+    for selecoes in SELECOES:
+        descricao = 'sem filtro' if all(v is None for v in selecoes.values()) else 'ano = 2024'
+        maior = 0
+        for _ in range(reruns):
+            tracemalloc.start()
+            resultado = rerun(df, papeis, selecoes, **extras)
+            maior = max(maior, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            del resultado
+        picos[descricao] = maior / 1024 / 1024
+    fila.put((variante, _rss_mb('VmHWM') - rss_base, picos, df.memory_usage(deep=True).sum() / 1024 / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=500_000)
+    parser.add_argument('--reruns', type=int, default=5)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    resultados = {}
+    for variante in ('antes', 'depois'):
+        processo = contexto.Process(target=medir, args=(variante, args.linhas, args.reruns, fila))
+        processo.start()
+        nome, rss, picos, tamanho = fila.get()
+        processo.join()
+        resultados[nome] = (rss, picos)
+
+    print(f"Planilha sintética: {args.linhas} linhas ({tamanho:.0f} MB em memória), {args.reruns} reruns por cenário\n")
+    print(f"{'':<10} {'pico RSS acima da planilha':>28}   pico de alocação por rerun")
+    for variante, (rss, picos) in resultados.items():
+        detalhes = ', '.join(f"{cenario}: {mb:.0f} MB" for cenario, mb in picos.items())
+        print(f"{variante:<10} {rss:>25.0f} MB   {detalhes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Compara o tempo de leitura da planilha com openpyxl e calamine.
+
+Uso:
+    python benchmarks/bench_motores_excel.py [--linhas 200000] [--repeticoes 1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados_sinteticos import gerar_planilha  # noqa: E402
+from excel_loader import calamine_disponivel, ler_planilha  # noqa: E402
+
+COLUNAS_DASHBOARD = [
+    'Ano da Campanha', 'Campanha', 'Meio', 'Veículo',
+    'Impacto (impressões e entrega de email)', 'Investimento', 'Leads',
+    'Taxa de abertura', 'Taxa de clique',
+]
+DTYPES_DASHBOARD = {
+    'Campanha': 'category', 'Meio': 'category', 'Veículo': 'category',
+    'Impacto (impressões e entrega de email)': 'int64', 'Investimento': 'float64', 'Leads': 'int64',
+}
+
+
+def medir(descricao, caminho, repeticoes, **kwargs):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = ler_planilha(caminho, **kwargs)
+        tempos.append(time.perf_counter() - inicio)
+    print(f"{descricao:<45} {min(tempos):8.2f}s  ({df.shape[0]} linhas x {df.shape[1]} colunas)")
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--repeticoes', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'campanhas.xlsx')
+        print(f"Gerando planilha sintética com {args.linhas} linhas...")
+        gerar_planilha(caminho, args.linhas)
+        print(f"Tamanho do arquivo: {os.path.getsize(caminho) / 1024 / 1024:.1f} MB\n")
+
+        base = medir("openpyxl (padrão atual)", caminho, args.repeticoes, motor='openpyxl')
+        medir("openpyxl + usecols/dtype", caminho, args.repeticoes, motor='openpyxl',
+              usecols=COLUNAS_DASHBOARD, dtype=DTYPES_DASHBOARD)
+
+        if not calamine_disponivel():
+            print("\npython-calamine não instalado: pip install python-calamine")
+            return
+
+        rapido = medir("calamine", caminho, args.repeticoes, motor='calamine')
+        enxuto = medir("calamine + usecols/dtype", caminho, args.repeticoes, motor='calamine',
+                       usecols=COLUNAS_DASHBOARD, dtype=DTYPES_DASHBOARD)
+        print(f"\nGanho do calamine: {base / rapido:.1f}x (com usecols/dtype: {base / enxuto:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Planilha sintética de campanhas usada pelos benchmarks"""
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+         'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+
+def gerar_campanhas(n_linhas, seed=42):
+    """DataFrame com as colunas da planilha real da Cocred e valores aleatórios"""
+    rng = np.random.default_rng(seed)
+    anos = rng.choice([2022, 2023, 2024, 2025], n_linhas)
+    meses = rng.integers(0, 12, n_linhas)
+    return pd.DataFrame({
+        'Ano da Campanha': anos,
+        'Campanha': rng.choice([f'Campanha {i:03d}' for i in range(120)], n_linhas),
+        'Meio': rng.choice(['Digital', 'TV', 'Rádio', 'OOH', 'E-mail', 'Impresso'], n_linhas),
+        'Veículo': rng.choice([f'Veículo {i:02d}' for i in range(40)], n_linhas),
+        'mês da análise': [f"{MESES[m]}/{a}" for m, a in zip(meses, anos)],
+        'Impacto (impressões e entrega de email)': rng.integers(1_000, 2_000_000, n_linhas),
+        'Investimento': rng.uniform(100, 50_000, n_linhas).round(2),
+        'Leads': rng.integers(0, 5_000, n_linhas),
+        'Taxa de abertura': rng.uniform(0, 1, n_linhas).round(4),
+        'Taxa de clique': rng.uniform(0, 0.2, n_linhas).round(4),
+        'Observações': rng.choice(['', 'Revisar criativo', 'Aprovado', 'Pausado'], n_linhas),
+        'Responsável': rng.choice(['Ana', 'Bruno', 'Carla', 'Diego'], n_linhas),
+    })
+
+
+def gerar_planilha(caminho, n_linhas, seed=42):
+    """Grava a planilha sintética em .xlsx (openpyxl write-only, para caber em memória)"""
+    df = gerar_campanhas(n_linhas, seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Campanhas')
+    ws.append(list(df.columns))
+    for linha in df.itertuples(index=False, name=None):
+        ws.append(list(linha))
+    wb.save(caminho)
+    return df
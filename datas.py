@@ -0,0 +1,170 @@
+"""Detecção e conversão das colunas de data da planilha"""
+import re
+import unicodedata
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Formatos testados nas colunas de texto, do mais para o menos comum na planilha
+FORMATOS_DATA = [
+    '%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%y', '%d-%m-%Y',
+    '%Y/%m/%d', '%m/%Y', '%Y-%m', 'ISO8601',
+]
+
+# Colunas numéricas com todos os valores inteiros nesse intervalo são anos
+ANOS_VALIDOS = (1900, 2100)
+
+# Valores distintos testados em cada coluna antes de confirmar o formato na coluna inteira
+TAMANHO_AMOSTRA = 200
+
+# Formato das colunas de mês e ano por extenso ('Janeiro/2024', 'jan/24', '01/2024')
+FORMATO_MES_ANO = 'mes/ano'
+
+# Nomes sem acento; abreviações são os começos com 3 letras ou mais ('jan', 'fev', 'sete')
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+
+# Mês (nome ou número) e ano, separados por '/', '-', '.', espaço ou ' de '
+_MES_ANO = re.compile(r'^([a-z]+|\d{1,2})\.?\s*(?:[/\-. ]|\s+de\s+)\s*(\d{4}|\d{2})$')
+_ANO_MES = re.compile(r'^(\d{4})\s*[/\-.]\s*(\d{1,2})$')
+
+
+def _valores_distintos(serie):
+    """Valores distintos não vazios (para categorias, as categorias usadas)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pd.Series(serie.cat.remove_unused_categories().cat.categories)
+    return pd.Series(serie.dropna().unique())
+
+
+def _numero_mes(texto):
+    if texto.isdigit():
+        numero = int(texto)
+        return numero if 1 <= numero <= 12 else None
+    if len(texto) < 3:
+        return None
+    return next((numero for nome, numero in MESES.items() if nome.startswith(texto)), None)
+
+
+def ler_mes_ano(valor, completo=True):
+    """Primeiro dia do mês de ``valor`` ('Janeiro/2024', 'jan/24', '01/2024', '2024-01'), ou NaT.
+
+    Acentos e maiúsculas são ignorados; anos com dois dígitos são do século
+    21. Com ``completo`` valores em outros formatos (datas completas, por
+    exemplo) passam pelo ``pd.to_datetime`` com o dia antes do mês.
+    """
+    if isinstance(valor, (datetime, date, np.datetime64)):
+        return pd.Timestamp(valor)
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii').strip().lower()
+
+    encontrado = _MES_ANO.match(texto)
+    if encontrado:
+        mes, ano = _numero_mes(encontrado.group(1)), encontrado.group(2)
+    else:
+        encontrado = _ANO_MES.match(texto)
+        mes, ano = (_numero_mes(encontrado.group(2)), encontrado.group(1)) if encontrado else (None, None)
+    if mes is not None:
+        ano = int(ano)
+        return pd.Timestamp(year=ano + 2000 if ano < 100 else ano, month=mes, day=1)
+
+    if not completo or not texto:
+        return pd.NaT
+    return pd.to_datetime(texto, dayfirst=True, errors='coerce')
+
+
+def converter_mes_ano(serie):
+    """Converte a coluna com ``ler_mes_ano``, lendo cada valor distinto uma única vez.
+
+    Os valores são codificados (colunas categóricas já trazem os códigos) e a
+    data de cada código é espalhada de volta para as linhas.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, distintos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, distintos = pd.factorize(serie)
+    datas = pd.DatetimeIndex([ler_mes_ano(valor) for valor in distintos], dtype='datetime64[ns]')
+    convertidas = np.full(len(serie), np.datetime64('NaT'), dtype='datetime64[ns]')
+    validos = codigos >= 0
+    convertidas[validos] = datas.to_numpy()[codigos[validos]]
+    return pd.Series(convertidas, index=serie.index, name=serie.name)
+
+
+def _formato_texto(valores):
+    """Primeiro formato de ``FORMATOS_DATA`` (ou o de mês/ano) que converte todos os ``valores``, ou None"""
+    valores = valores.astype(str).str.strip()
+    valores = valores[valores != '']
+    if valores.empty:
+        return None
+    amostra = valores.iloc[:TAMANHO_AMOSTRA]
+    for formato in FORMATOS_DATA:
+        if pd.to_datetime(amostra, format=formato, errors='coerce').notna().all():
+            # A amostra passou: confirma nos demais valores distintos
+            if pd.to_datetime(valores, format=formato, errors='coerce').notna().all():
+                return formato
+
+    if _sao_meses(amostra) and _sao_meses(valores.iloc[TAMANHO_AMOSTRA:]):
+        return FORMATO_MES_ANO
+    return None
+
+
+def _sao_meses(textos):
+    return all(pd.notna(ler_mes_ano(texto, completo=False)) for texto in textos)
+
+
+def _sao_anos(serie):
+    valores = serie.dropna()
+    if valores.empty or not np.array_equal(valores, np.floor(valores)):
+        return False
+    return ANOS_VALIDOS[0] <= valores.min() and valores.max() <= ANOS_VALIDOS[1]
+
+
+def detectar_colunas_data(df, papeis):
+    """Colunas de data da planilha e o formato de cada uma: ``{coluna: formato}``.
+
+    Feita uma vez por versão da planilha. Entram as colunas já em datetime,
+    as de texto em que todos os valores seguem um dos ``FORMATOS_DATA``
+    (testado numa amostra dos valores distintos e depois confirmado em todos
+    eles) e as colunas cujo nome indica data (``papeis['datas']``), mesmo sem
+    formato reconhecido. O formato é None quando não foi reconhecido;
+    ``FORMATO_MES_ANO`` indica mês e ano por extenso ou numéricos e '%Y' uma
+    coluna numérica de anos.
+    """
+    sugeridas = set(papeis['datas'])
+    encontradas = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            encontradas[col] = None
+        elif pd.api.types.is_numeric_dtype(serie):
+            # Números só são datas quando o nome sugere (ex.: 'Ano da Campanha')
+            if col in sugeridas:
+                encontradas[col] = '%Y' if _sao_anos(serie) else None
+        else:
+            formato = _formato_texto(_valores_distintos(serie))
+            if formato is not None or col in sugeridas:
+                encontradas[col] = formato
+
+    # 'mês da análise' (a primeira de papeis['datas'], quando existe) vem primeiro
+    primeira = next((col for col in papeis['datas'] if col in encontradas), None)
+    if primeira is not None:
+        encontradas = {primeira: encontradas.pop(primeira), **encontradas}
+    return encontradas
+
+
+def converter_datas(serie, formato=None):
+    """Converte a coluna para datetime com o formato detectado (vazio quando não converte).
+
+    Colunas de texto sem formato conhecido são lidas valor a valor por
+    ``ler_mes_ano`` (cada valor distinto uma vez).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    if formato == '%Y':
+        return pd.to_datetime(serie.astype('Int64').astype(str), format='%Y', errors='coerce')
+    if formato == FORMATO_MES_ANO or (formato is None and not pd.api.types.is_numeric_dtype(serie)):
+        return converter_mes_ano(serie)
+    if formato is None:
+        return pd.to_datetime(serie, errors='coerce')
+    return pd.to_datetime(serie.astype(str).str.strip(), format=formato, errors='coerce')
@@ -0,0 +1,196 @@
+"""Cache compartilhado das planilhas carregadas, comum a todas as sessões do Streamlit"""
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class _Entrada:
+    """Uma versão da planilha em memória e as sessões que a estão usando"""
+    __slots__ = ('df', 'tamanho', 'sessoes', 'derivados')
+
+    def __init__(self, df):
+        self.df = df
+        self.tamanho = int(df.memory_usage(deep=True).sum())
+        self.sessoes = {}
+        self.derivados = {}
+
+
+def _tamanho_aproximado(objeto, vistos):
+    """Bytes aproximados de ``objeto`` e do que ele referencia (arrays, DataFrames, coleções, atributos).
+
+    Objetos cujo id está em ``vistos`` não são contados de novo (ex.: a
+    própria planilha referenciada por um índice).
+    """
+    total = 0
+    pendentes = [objeto]
+    while pendentes:
+        atual = pendentes.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        if isinstance(atual, np.ndarray):
+            total += atual.nbytes
+        elif isinstance(atual, (pd.DataFrame, pd.Series, pd.Index)):
+            uso = atual.memory_usage(deep=True)
+            total += int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+        else:
+            total += sys.getsizeof(atual)
+            if isinstance(atual, dict):
+                pendentes.extend(atual.keys())
+                pendentes.extend(atual.values())
+            elif isinstance(atual, (list, tuple, set, frozenset)):
+                pendentes.extend(atual)
+            elif not isinstance(atual, (str, bytes, int, float, bool, type(None), type, types.ModuleType,
+                                        types.FunctionType, types.MethodType)):
+                pendentes.extend(getattr(atual, '__dict__', {}).values())
+                for nome in getattr(type(atual), '__slots__', ()):
+                    if hasattr(atual, nome):
+                        pendentes.append(getattr(atual, nome))
+    return total
+
+
+class DatasetStore:
+    """Mantém uma única cópia de cada versão da planilha para todas as sessões.
+
+    As chaves identificam a versão do arquivo (ex.: ``(DRIVE_ID, ITEM_ID, eTag)``),
+    então a memória cresce com o número de versões distintas e não com o número
+    de usuários. Cada sessão registra o uso da versão que está exibindo; quando o
+    total passa de ``limite_bytes``, as versões sem sessões ativas são descartadas,
+    da menos usada recentemente para a mais recente. Sessões que não dão sinal por
+    ``tempo_sessao`` segundos (aba fechada, por exemplo) deixam de contar.
+
+    O tamanho de cada versão inclui, aproximadamente, o dos derivados
+    guardados com ela (índices, cubos, chaves de ordenação).
+
+    Os DataFrames são compartilhados entre sessões e devem ser tratados como
+    somente leitura.
+    """
+
+    def __init__(self, limite_bytes, tempo_sessao=3600):
+        self.limite_bytes = limite_bytes
+        self.tempo_sessao = tempo_sessao
+        self._entradas = OrderedDict()
+        self._carregando = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, sessao=None):
+        """Retorna o DataFrame da versão (ou None) e renova o uso pela sessão"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(chave)
+            if sessao is not None:
+                entrada.sessoes[sessao] = time.monotonic()
+            return entrada.df
+
+    def obter_ou_carregar(self, chave, carregar, sessao=None):
+        """Retorna a versão em cache ou executa ``carregar()`` uma única vez.
+
+        Sessões que pedem a mesma versão ao mesmo tempo esperam o primeiro
+        carregamento em vez de baixar a planilha novamente. Se ``carregar``
+        retornar None nada é guardado.
+        """
+        df = self.obter(chave, sessao)
+        if df is not None:
+            return df
+
+        with self._lock:
+            lock_chave = self._carregando.setdefault(chave, threading.Lock())
+
+        with lock_chave:
+            df = self.obter(chave, sessao)
+            if df is None:
+                df = carregar()
+                if df is not None:
+                    self._guardar(chave, df, sessao)
+
+        with self._lock:
+            if self._carregando.get(chave) is lock_chave:
+                del self._carregando[chave]
+        return df
+
+    def derivado(self, chave, nome, calcular):
+        """Resultado de ``calcular()`` guardado junto com a versão.
+
+        Usado para estruturas derivadas da planilha (papéis das colunas, índices,
+        agregados): são calculadas uma vez por versão, compartilhadas entre as
+        sessões e descartadas junto com ela. Se a versão não está mais em memória
+        o resultado é calculado sem ser guardado.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                vistos = None
+            elif nome in entrada.derivados:
+                return entrada.derivados[nome]
+            else:
+                # A planilha e os demais derivados já estão na conta da versão
+                vistos = {id(entrada.df)} | {id(valor) for valor in entrada.derivados.values()}
+
+        resultado = calcular()
+        if entrada is None:
+            return resultado
+
+        tamanho = _tamanho_aproximado(resultado, vistos)
+        with self._lock:
+            if nome in entrada.derivados:
+                return entrada.derivados[nome]
+            entrada.derivados[nome] = resultado
+            entrada.tamanho += tamanho
+            self._descartar_excedente()
+        return resultado
+
+    def liberar(self, chave, sessao):
+        """Indica que a sessão não usa mais a versão"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                entrada.sessoes.pop(sessao, None)
+            self._descartar_excedente()
+
+    def chaves(self):
+        """Chaves das versões atualmente em memória"""
+        with self._lock:
+            return list(self._entradas)
+
+    def estatisticas(self):
+        """Resumo do uso do cache (versões, bytes e sessões ativas)"""
+        with self._lock:
+            return {
+                'versoes': len(self._entradas),
+                'bytes': sum(e.tamanho for e in self._entradas.values()),
+                'sessoes': sum(len(e.sessoes) for e in self._entradas.values()),
+            }
+
+    def _guardar(self, chave, df, sessao):
+        entrada = _Entrada(df)
+        if sessao is not None:
+            entrada.sessoes[sessao] = time.monotonic()
+        with self._lock:
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            self._descartar_excedente()
+
+    def _descartar_excedente(self):
+        # Deve ser chamado com self._lock adquirido
+        total = sum(e.tamanho for e in self._entradas.values())
+        if total <= self.limite_bytes:
+            return
+
+        agora = time.monotonic()
+        for chave in list(self._entradas):
+            if total <= self.limite_bytes:
+                break
+            entrada = self._entradas[chave]
+            entrada.sessoes = {
+                s: t for s, t in entrada.sessoes.items() if agora - t < self.tempo_sessao
+            }
+            if not entrada.sessoes:
+                del self._entradas[chave]
+                total -= entrada.tamanho
@@ -0,0 +1,116 @@
+"""Nomes de colunas reconhecidos na planilha de campanhas"""
+
+# Possíveis nomes de cada coluna, em ordem de preferência
+POSSIVEIS_ANO = [
+    'Ano da Campanha',
+    'Ano', 'ano', 'ANO',
+    'Ano da campanha', 'ano da campanha'
+]
+
+POSSIVEIS_IMPACTO = [
+    'Impacto (impressões e entrega de email)',
+    'Impacto', 'impacto', 'IMPACTO',
+    'Impressões', 'impressões', 'IMPRESSÕES',
+    'Impressoes', 'impressoes', 'IMPRESSOES',
+    'Visualizações', 'visualizações', 'VISUALIZAÇÕES',
+    'Visualizacoes', 'visualizacoes', 'VISUALIZACOES',
+    'views', 'Views', 'VIEWS',
+    'alcance', 'Alcance', 'ALCANCE'
+]
+
+POSSIVEIS_INVESTIMENTO = ['Investimento', 'investimento', 'INVESTIMENTO', 'gasto', 'custo']
+POSSIVEIS_LEADS = ['Leads', 'leads', 'LEADS', 'conversoes', 'conversões']
+POSSIVEIS_MEIO = ['Meio']
+POSSIVEIS_VEICULO = ['Veículo', 'Veiculo']
+
+# Trechos de nome que identificam a coluna de campanha e as colunas de taxa
+PALAVRAS_CAMPANHA = ['campanha', 'campaign']
+PALAVRAS_NOME = ['nome', 'name']
+PALAVRAS_TAXA = ['taxa', 'percentual', 'porcentagem', 'ctr', 'conversão', 'abertura', 'clique']
+
+# Colunas de data: 'mês da análise' tem preferência; as demais são reconhecidas pelo nome
+COLUNA_MES_ANALISE = 'mês da análise'
+PALAVRAS_DATA = ['data', 'date', 'mês', 'mes', 'ano', 'year']
+
+
+def primeira_coluna(colunas, possiveis):
+    """Primeiro nome de ``possiveis`` presente em ``colunas``, ou None"""
+    return next((nome for nome in possiveis if nome in colunas), None)
+
+
+def colunas_com_palavras(colunas, palavras):
+    """Colunas cujo nome contém algum dos trechos (sem diferenciar maiúsculas)"""
+    return [col for col in colunas if any(p in str(col).lower() for p in palavras)]
+
+
+def coluna_campanha(colunas):
+    """Coluna com o nome da campanha (ignora 'Ano da Campanha' e afins)"""
+    candidatas = [col for col in colunas_com_palavras(colunas, PALAVRAS_CAMPANHA) if col not in POSSIVEIS_ANO]
+    return candidatas[0] if candidatas else None
+
+
+def resolver_colunas(colunas):
+    """Papel de cada coluna a partir só dos nomes (serve também para o cabeçalho da planilha).
+
+    Retorna um dicionário com a coluna de cada papel (``ano``, ``campanha``,
+    ``nome``, ``meio``, ``veiculo``, ``impacto``, ``investimento``, ``leads``,
+    ``data``; None quando não existe) e as listas ``datas`` e ``taxas``.
+    """
+    colunas = list(colunas)
+    datas = colunas_com_palavras(colunas, PALAVRAS_DATA)
+    if COLUNA_MES_ANALISE in colunas:
+        datas = [COLUNA_MES_ANALISE] + [col for col in datas if col != COLUNA_MES_ANALISE]
+
+    return {
+        'ano': primeira_coluna(colunas, POSSIVEIS_ANO),
+        'campanha': coluna_campanha(colunas),
+        'nome': next(iter(colunas_com_palavras(colunas, PALAVRAS_NOME)), None),
+        'meio': primeira_coluna(colunas, POSSIVEIS_MEIO),
+        'veiculo': primeira_coluna(colunas, POSSIVEIS_VEICULO),
+        'impacto': primeira_coluna(colunas, POSSIVEIS_IMPACTO),
+        'investimento': primeira_coluna(colunas, POSSIVEIS_INVESTIMENTO),
+        'leads': primeira_coluna(colunas, POSSIVEIS_LEADS),
+        'data': datas[0] if datas else None,
+        'datas': datas,
+        'taxas': colunas_com_palavras(colunas, PALAVRAS_TAXA),
+    }
+
+
+def resolver_papeis(df):
+    """Mapa de papéis das colunas do DataFrame, calculado uma vez por versão da planilha.
+
+    Além dos papéis de ``resolver_colunas`` traz as listas ``numericas``
+    (float64/int64) e ``categoricas`` (texto ou categoria), usadas pelas
+    análises e exportações, e ``percentuais``: as colunas de taxa numéricas
+    com todos os valores entre 0 e 1, exibidas como percentual.
+    """
+    papeis = resolver_colunas(df.columns)
+    papeis['numericas'] = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+    papeis['categoricas'] = df.select_dtypes(include=['object', 'category']).columns.tolist()
+
+    taxas = [col for col in papeis['taxas'] if col in papeis['numericas']]
+    if taxas:
+        minimos, maximos = df[taxas].min(), df[taxas].max()
+        papeis['percentuais'] = [col for col in taxas if minimos[col] >= 0 and maximos[col] <= 1]
+    else:
+        papeis['percentuais'] = []
+    return papeis
+
+
+def colunas_enxutas(colunas):
+    """Colunas usadas pelo Dashboard de Métricas, na ordem da planilha.
+
+    São as colunas de ano, campanha, meio, veículo, impacto, investimento e
+    leads, mais as colunas de taxa exibidas na Tabela Geral.
+    """
+    papeis = resolver_colunas(colunas)
+    usadas = {papeis[papel] for papel in ('ano', 'campanha', 'meio', 'veiculo', 'impacto', 'investimento', 'leads')}
+    usadas.update(papeis['taxas'])
+    return [col for col in colunas if col in usadas]
+
+
+def dtypes_dimensoes(colunas):
+    """Tipos declarados na leitura: as colunas de filtro viram categorias"""
+    papeis = resolver_colunas(colunas)
+    dimensoes = [papeis['campanha'], papeis['meio'], papeis['veiculo']]
+    return {col: 'category' for col in dimensoes if col is not None}
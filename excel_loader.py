@@ -0,0 +1,53 @@
+"""Leitura da planilha de campanhas com o motor de Excel mais rápido disponível"""
+import importlib.util
+
+import pandas as pd
+
+# 'auto' usa o calamine (Rust) quando instalado e cai para o openpyxl caso contrário
+MOTORES = ('auto', 'calamine', 'openpyxl')
+
+
+def calamine_disponivel():
+    return importlib.util.find_spec('python_calamine') is not None
+
+
+def escolher_motor(motor='auto'):
+    """Resolve o motor pedido para um que esteja instalado"""
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de Excel desconhecido: {motor} (use {', '.join(MOTORES)})")
+    if motor in ('auto', 'calamine'):
+        return 'calamine' if calamine_disponivel() else 'openpyxl'
+    return motor
+
+
+def ler_planilha(arquivo, motor='auto', usecols=None, dtype=None, sheet_name=0):
+    """Lê a planilha com o motor escolhido.
+
+    ``usecols`` e ``dtype`` são repassados ao ``pd.read_excel``: ler só as
+    colunas usadas e declarar os tipos evita converter o restante da planilha.
+    Chaves de ``dtype`` que não existem na planilha são ignoradas.
+
+    As colunas declaradas como ``'category'`` são convertidas depois da
+    leitura: o ``read_excel`` ordena as categorias e falha quando a coluna
+    mistura números e texto (uma campanha ``2024`` ao lado de ``Verão``).
+    """
+    dtype = dtype or {}
+    categorias = [col for col, tipo in dtype.items() if tipo == 'category']
+    df = pd.read_excel(
+        arquivo,
+        engine=escolher_motor(motor),
+        sheet_name=sheet_name,
+        usecols=usecols,
+        dtype={col: tipo for col, tipo in dtype.items() if tipo != 'category'} or None
+    )
+    categorias = [col for col in categorias if col in df.columns]
+    if categorias:
+        df[categorias] = df[categorias].astype('category')
+    return df
+
+
+def ler_cabecalho(arquivo, motor='auto', sheet_name=0):
+    """Nomes das colunas da planilha, sem ler as linhas; volta o arquivo ao início"""
+    colunas = pd.read_excel(arquivo, engine=escolher_motor(motor), sheet_name=sheet_name, nrows=0).columns
+    arquivo.seek(0)
+    return colunas.tolist()
@@ -0,0 +1,113 @@
+"""Fila de exportações (PDF, Excel, CSV) geradas em segundo plano, comum a todas as sessões"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+NA_FILA = 'na fila'
+GERANDO = 'gerando'
+PRONTO = 'pronto'
+ERRO = 'erro'
+
+
+class Trabalho:
+    """Uma exportação pedida: estado, progresso e, ao final, o arquivo ``(nome, bytes)``"""
+    __slots__ = ('id', 'chave', 'estado', 'progresso', 'mensagem', 'resultado', 'erro', 'concluido_em')
+
+    def __init__(self, chave):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.estado = NA_FILA
+        self.progresso = 0.0
+        self.mensagem = 'Aguardando na fila...'
+        self.resultado = None
+        self.erro = None
+        self.concluido_em = None
+
+    @property
+    def em_andamento(self):
+        return self.estado in (NA_FILA, GERANDO)
+
+    def atualizar(self, progresso, mensagem=None):
+        """Chamado pela função de geração para informar o avanço (0 a 1)"""
+        self.progresso = min(max(float(progresso), 0.0), 1.0)
+        if mensagem:
+            self.mensagem = mensagem
+
+
+class FilaExportacoes:
+    """Executa as exportações num pool limitado de threads, fora da thread do script.
+
+    Cada pedido recebe um ``Trabalho`` com id próprio; a sessão guarda só o id
+    e acompanha o progresso a cada rerun. Pedidos com a mesma chave (versão da
+    planilha, filtros e formato) reaproveitam o trabalho já existente, mesmo
+    vindos de sessões diferentes. No máximo ``max_simultaneos`` exportações
+    rodam ao mesmo tempo (as demais esperam na fila) e só os
+    ``max_guardados`` trabalhos concluídos mais recentes ficam em memória.
+
+    As funções de geração não podem chamar ``st.*``: os dados que vêm da
+    sessão devem ser lidos antes do envio.
+    """
+
+    def __init__(self, max_simultaneos=2, max_guardados=20):
+        self.max_guardados = max_guardados
+        self._executor = ThreadPoolExecutor(max_workers=max_simultaneos, thread_name_prefix='exportacao')
+        self._trabalhos = OrderedDict()
+        self._por_chave = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, chave, gerar):
+        """Agenda ``gerar(progresso)`` e retorna o ``Trabalho``.
+
+        ``gerar`` recebe a função ``progresso(fracao, mensagem=None)`` e deve
+        retornar ``(nome_arquivo, bytes)``. Se já existe um trabalho com a
+        mesma chave, em andamento ou pronto, ele é retornado sem gerar de novo.
+        """
+        with self._lock:
+            existente = self._trabalhos.get(self._por_chave.get(chave))
+            if existente is not None and existente.estado != ERRO:
+                self._trabalhos.move_to_end(existente.id)
+                return existente
+
+            trabalho = Trabalho(chave)
+            self._trabalhos[trabalho.id] = trabalho
+            self._por_chave[chave] = trabalho.id
+            self._descartar_excedente()
+        self._executor.submit(self._executar, trabalho, gerar)
+        return trabalho
+
+    def obter(self, id_trabalho):
+        """O ``Trabalho`` com esse id, ou None se já foi descartado"""
+        with self._lock:
+            return self._trabalhos.get(id_trabalho)
+
+    def estatisticas(self):
+        """Quantidade de trabalhos guardados em cada estado"""
+        with self._lock:
+            contagem = {NA_FILA: 0, GERANDO: 0, PRONTO: 0, ERRO: 0}
+            for trabalho in self._trabalhos.values():
+                contagem[trabalho.estado] += 1
+            return contagem
+
+    def _executar(self, trabalho, gerar):
+        trabalho.estado = GERANDO
+        trabalho.atualizar(0.0, 'Gerando arquivo...')
+        try:
+            trabalho.resultado = gerar(trabalho.atualizar)
+            trabalho.atualizar(1.0, 'Arquivo pronto')
+            trabalho.estado = PRONTO
+        except Exception as e:
+            trabalho.erro = str(e)
+            trabalho.estado = ERRO
+        trabalho.concluido_em = time.monotonic()
+        with self._lock:
+            self._descartar_excedente()
+
+    def _descartar_excedente(self):
+        # Deve ser chamado com self._lock adquirido; trabalhos em andamento nunca são descartados
+        concluidos = [t for t in self._trabalhos.values() if not t.em_andamento]
+        for trabalho in concluidos[:max(0, len(concluidos) - self.max_guardados)]:
+            del self._trabalhos[trabalho.id]
+            if self._por_chave.get(trabalho.chave) == trabalho.id:
+                del self._por_chave[trabalho.chave]
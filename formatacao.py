@@ -0,0 +1,23 @@
+"""Formatação dos valores exibidos nas tabelas do Streamlit"""
+import streamlit as st
+
+
+def formatar_percentuais(df, colunas):
+    """Prepara colunas de fração (0.15) para exibição como percentual arredondado (15%).
+
+    Os valores continuam numéricos (ordenáveis na tabela): cada coluna é
+    multiplicada por 100 de uma vez e o ``%`` vem do ``column_config`` do
+    ``st.dataframe``. Retorna ``(df_exibicao, column_config)``; ``df`` não é
+    alterado.
+    """
+    colunas = [col for col in colunas if col in df.columns]
+    if not colunas:
+        return df, None
+    # Cópia rasa: as demais colunas não são copiadas (com o copy-on-write ligado
+    # nos apps, só as colunas substituídas ocupam memória nova)
+    df_exibicao = df.copy(deep=False)
+    for col in colunas:
+        # Vazios aparecem como 0%, como antes
+        df_exibicao[col] = df[col].mul(100).fillna(0)
+    config = {col: st.column_config.NumberColumn(format="%.0f%%") for col in colunas}
+    return df_exibicao, config
@@ -0,0 +1,216 @@
+"""Gera em lote os relatórios (PDF executivo e Excel) por campanha e/ou ano, sem o Streamlit.
+
+A planilha vem de um arquivo local (``--arquivo``) ou do SharePoint via Graph,
+com as mesmas credenciais do app lidas de variáveis de ambiente (TENANT_ID,
+CLIENT_ID, CLIENT_SECRET, DRIVE_ID, ITEM_ID). Os relatórios são distribuídos
+entre processos; cada processo recebe a planilha uma vez e monta o próprio
+índice de filtros e cubo de KPIs.
+
+Uso:
+    python gerar_relatorios.py --arquivo campanhas.xlsx
+    python gerar_relatorios.py --por campanha ano --formatos pdf --saida relatorios/
+    python gerar_relatorios.py --ano 2024 --processos 4
+"""
+import argparse
+import itertools
+import os
+import re
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from agregacoes import DIMENSOES, CuboKPIs, IndiceFiltros
+from esquema import dtypes_dimensoes, resolver_papeis
+from excel_loader import MOTORES, ler_cabecalho, ler_planilha
+from relatorios import exportar_excel_completo, gerar_relatorio_executivo
+
+VARIAVEIS_GRAPH = ('TENANT_ID', 'CLIENT_ID', 'CLIENT_SECRET', 'DRIVE_ID', 'ITEM_ID')
+FORMATOS = ('pdf', 'excel')
+EXTENSOES = {'pdf': 'pdf', 'excel': 'xlsx'}
+
+# Estado de cada processo do pool (ver _iniciar_processo)
+_df = _papeis = _indice = _cubo = None
+
+
+# ========== CARGA DA PLANILHA ==========
+def ler_arquivo(arquivo, motor='auto'):
+    """Planilha com todas as colunas, com as dimensões de filtro já categóricas"""
+    colunas = ler_cabecalho(arquivo, motor)
+    return ler_planilha(arquivo, motor, dtype=dtypes_dimensoes(colunas))
+
+
+def baixar_do_graph():
+    """Baixa a planilha do SharePoint com as credenciais das variáveis de ambiente"""
+    faltando = [nome for nome in VARIAVEIS_GRAPH if not os.environ.get(nome)]
+    if faltando:
+        raise SystemExit(f"Informe --arquivo ou defina as variáveis de ambiente: {', '.join(faltando)}")
+
+    print("Baixando a planilha do SharePoint...")
+    # Só necessários para baixar do Graph
+    import msal
+    from graph_client import GraphClient, TokenCache
+
+    app = msal.ConfidentialClientApplication(
+        client_id=os.environ['CLIENT_ID'],
+        client_credential=os.environ['CLIENT_SECRET'],
+        authority=f"https://login.microsoftonline.com/{os.environ['TENANT_ID']}"
+    )
+    token_cache = TokenCache(lambda: app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"]))
+    cliente = GraphClient(
+        os.environ['DRIVE_ID'], os.environ['ITEM_ID'], token_cache.obter, invalidar_token=token_cache.invalidar
+    )
+    return cliente.download_content()
+
+
+# ========== RELATÓRIOS ==========
+def _normalizar_ano(valor):
+    """'2024', '2024.0' e 2024 viram '2024'; outros textos ficam como estão"""
+    texto = str(valor).strip()
+    try:
+        numero = float(texto)
+    except ValueError:
+        return texto
+    return str(int(numero)) if numero.is_integer() else texto
+
+
+def nome_arquivo(selecoes):
+    """'relatorio_2024_campanha-de-verao' a partir dos valores filtrados"""
+    partes = []
+    for nome, valor in selecoes.items():
+        if valor is None:
+            continue
+        if nome == 'ano':
+            valor = _normalizar_ano(valor)
+        texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii')
+        partes.append(re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-') or 'sem-nome')
+    return '_'.join(['relatorio', *partes]) if partes else 'relatorio_geral'
+
+
+def encontrar_ano(indice, ano):
+    """Valor do filtro de ano da planilha que corresponde a ``ano``, ou None se não existe"""
+    normalizado = _normalizar_ano(ano)
+    return next((valor for valor in indice.opcoes('ano') if _normalizar_ano(valor) == normalizado), None)
+
+
+def listar_selecoes(indice, cubo, por, ano=None):
+    """Uma seleção ``{dimensao: valor}`` por combinação de valores com dados na planilha"""
+    fixos = {nome: None for nome in DIMENSOES}
+    if ano is not None:
+        fixos['ano'] = ano
+    valores = [indice.opcoes(nome) if nome != 'ano' or ano is None else [ano] for nome in por]
+
+    selecoes = []
+    for combinacao in itertools.product(*valores):
+        selecao = {**fixos, **dict(zip(por, combinacao))}
+        if cubo.totais(selecao)['registros'] > 0:
+            selecoes.append(selecao)
+    return selecoes
+
+
+def _iniciar_processo(df, papeis):
+    global _df, _papeis, _indice, _cubo
+    pd.options.mode.copy_on_write = True
+    _df, _papeis = df, papeis
+    _indice = IndiceFiltros(df, papeis)
+    _cubo = CuboKPIs(df, papeis, _indice)
+
+
+def gerar(selecoes, nome, formatos, saida):
+    """Grava os relatórios de uma seleção e retorna os caminhos dos arquivos"""
+    caminhos = []
+    for formato in formatos:
+        if formato == 'pdf':
+            conteudo = gerar_relatorio_executivo(_cubo, selecoes)
+        else:
+            posicoes = _indice.filtrar(selecoes)
+            dados = _df if posicoes is None else _df.iloc[posicoes]
+            conteudo = exportar_excel_completo(dados, _papeis['campanha']).getvalue()
+
+        caminho = os.path.join(saida, f"{nome}.{EXTENSOES[formato]}")
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        caminhos.append(caminho)
+    return caminhos
+
+
+# ========== LINHA DE COMANDO ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--arquivo', help="Planilha local (.xlsx); sem ele a planilha é baixada do SharePoint")
+    parser.add_argument('--saida', default='relatorios', help="Pasta dos arquivos gerados (padrão: relatorios)")
+    parser.add_argument('--por', nargs='+', choices=DIMENSOES, default=['campanha'],
+                        help="Dimensões combinadas em cada relatório (padrão: campanha)")
+    parser.add_argument('--ano', help="Gera só os relatórios deste ano")
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=list(FORMATOS))
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                        help="Processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument('--motor', choices=MOTORES, default='auto', help="Motor de leitura do Excel")
+    args = parser.parse_args(argv)
+    if args.processos < 1:
+        parser.error("--processos deve ser pelo menos 1")
+
+    pd.options.mode.copy_on_write = True
+    if args.arquivo:
+        with open(args.arquivo, 'rb') as arquivo:
+            df = ler_arquivo(arquivo, args.motor)
+    else:
+        with baixar_do_graph() as arquivo:
+            df = ler_arquivo(arquivo, args.motor)
+
+    papeis = resolver_papeis(df)
+    faltando = [nome for nome in args.por if papeis.get(nome) is None]
+    if faltando:
+        raise SystemExit(f"Coluna não encontrada na planilha: {', '.join(faltando)}")
+
+    indice = IndiceFiltros(df, papeis)
+    ano = None
+    if args.ano is not None:
+        ano = encontrar_ano(indice, args.ano)
+        if ano is None:
+            anos = sorted({_normalizar_ano(valor) for valor in indice.opcoes('ano')} - {'nan'})
+            anos = ', '.join(anos) or 'nenhum'
+            raise SystemExit(f"Ano {args.ano} não encontrado na planilha (anos disponíveis: {anos})")
+
+    cubo = CuboKPIs(df, papeis, indice)
+    selecoes = listar_selecoes(indice, cubo, args.por, ano)
+    if not selecoes:
+        raise SystemExit("Nenhuma linha na planilha para os filtros pedidos.")
+
+    # Valores diferentes podem gerar o mesmo nome de arquivo ('A/B' e 'A-B')
+    nomes, usados = [], set()
+    for selecao in selecoes:
+        nome = base = nome_arquivo(selecao)
+        for sufixo in itertools.count(2):
+            if nome not in usados:
+                break
+            nome = f"{base}_{sufixo}"
+        usados.add(nome)
+        nomes.append(nome)
+
+    os.makedirs(args.saida, exist_ok=True)
+    print(f"{len(df)} linhas lidas; gerando {len(selecoes)} relatório(s) em {args.saida} "
+          f"com {args.processos} processo(s)")
+
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=args.processos, initializer=_iniciar_processo,
+                             initargs=(df, papeis)) as pool:
+        futuros = {
+            pool.submit(gerar, selecao, nome, args.formatos, args.saida): nome
+            for selecao, nome in zip(selecoes, nomes)
+        }
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            try:
+                caminhos = futuro.result()
+            except Exception as e:
+                falhas += 1
+                print(f"[{concluidos}/{len(futuros)}] Erro em {futuros[futuro]}: {e}", file=sys.stderr)
+                continue
+            print(f"[{concluidos}/{len(futuros)}] {', '.join(os.path.basename(c) for c in caminhos)}")
+
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Acesso ao Microsoft Graph: autenticação e download da planilha"""
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+# Downloads até este tamanho ficam em memória; acima disso vão para um arquivo temporário
+LIMITE_DOWNLOAD_MEMORIA = 64 * 1024 * 1024
+TAMANHO_BLOCO = 1024 * 1024
+
+# Respostas que indicam falha temporária (throttling ou indisponibilidade)
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+# Só os campos usados na verificação de versão e no painel de informações
+CAMPOS_METADATA = 'id,name,size,eTag,cTag,lastModifiedDateTime'
+
+
+class AuthError(Exception):
+    """Falha ao obter o token de acesso no Entra ID"""
+
+
+class GraphError(Exception):
+    """Falha numa chamada ao Microsoft Graph"""
+
+    def __init__(self, mensagem, status=None, retry_after=None, retentavel=False):
+        super().__init__(mensagem)
+        self.status = status
+        self.retry_after = retry_after
+        self.retentavel = retentavel
+
+
+class CircuitoAbertoError(GraphError):
+    """O Graph falhou seguidas vezes e as chamadas estão suspensas por um tempo"""
+
+
+def _ler_retry_after(valor):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos"""
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max((data - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Suspende as chamadas por ``tempo_aberto`` segundos após ``limite_falhas`` chamadas falharem seguidas.
+
+    Passado esse tempo as chamadas voltam a ser tentadas; a primeira falha
+    reabre o circuito e o primeiro sucesso o fecha de vez.
+    """
+
+    def __init__(self, limite_falhas=5, tempo_aberto=30):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            return time.monotonic() >= self._aberto_ate
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._aberto_ate = 0.0
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+
+
+class TokenCache:
+    """Token de acesso do aplicativo, compartilhado por todas as sessões.
+
+    ``adquirir`` é chamado só quando não há token ou quando faltam menos de
+    ``margem`` segundos para ele expirar, e deve retornar o dicionário do MSAL
+    (``access_token``, ``expires_in``). Reruns simultâneos esperam uma única
+    renovação em vez de chamarem o Entra ID cada um.
+    """
+
+    def __init__(self, adquirir, margem=300):
+        self._adquirir = adquirir
+        self.margem = margem
+        self._token = None
+        self._expira_em = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self):
+        token, expira_em = self._token, self._expira_em
+        if token and time.monotonic() < expira_em - self.margem:
+            return token
+
+        with self._lock:
+            # Outra sessão pode ter renovado enquanto esperávamos
+            if self._token and time.monotonic() < self._expira_em - self.margem:
+                return self._token
+
+            result = self._adquirir()
+            if "access_token" not in result:
+                raise AuthError(result.get('error_description', 'Erro desconhecido'))
+
+            self._token = result["access_token"]
+            self._expira_em = time.monotonic() + int(result.get('expires_in', 3600))
+            return self._token
+
+    def invalidar(self):
+        """Descarta o token atual (ex.: após um 401 do Graph)"""
+        with self._lock:
+            self._token = None
+            self._expira_em = 0.0
+
+
+class GraphClient:
+    """Cliente do Graph para um item do drive, com conexões HTTP reaproveitadas.
+
+    Uma única ``requests.Session`` (keep-alive, pool de conexões) atende todas as
+    sessões do Streamlit, então só a primeira chamada paga o handshake TLS.
+    ``token_provider`` é chamado a cada requisição e deve retornar o token de
+    acesso (normalmente ``TokenCache.obter``); ``invalidar_token`` é chamado
+    quando o Graph recusa o token (401), antes de tentar de novo.
+
+    Falhas temporárias (conexão, timeout, 429, 5xx) são repetidas até
+    ``max_tentativas`` vezes com backoff exponencial com jitter, respeitando o
+    ``Retry-After`` do Graph. Chamadas que esgotam as tentativas seguidas vezes
+    abrem o circuito e as seguintes falham na hora com ``CircuitoAbertoError``
+    (429 com ``Retry-After`` não conta). ``estatisticas()``
+    mostra quantas vezes cada caminho (``metadata``, ``content``) foi
+    tentado, repetido, limitado pelo Graph ou falhou.
+    """
+
+    def __init__(self, drive_id, item_id, token_provider, invalidar_token=None,
+                 base_url=GRAPH_URL, max_conexoes=10, timeout=(10, 60),
+                 max_tentativas=4, espera_base=0.5, espera_maxima=30.0,
+                 circuito=None):
+        self.url_item = f"{base_url}/drives/{drive_id}/items/{item_id}"
+        self._token_provider = token_provider
+        self._invalidar_token = invalidar_token
+        self.timeout = timeout
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.circuito = circuito or CircuitBreaker()
+
+        self._contadores = Counter()
+        self._lock_contadores = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix='graph')
+
+    def _contar(self, caminho, evento):
+        with self._lock_contadores:
+            self._contadores[(caminho, evento)] += 1
+
+    def estatisticas(self):
+        """Contadores por caminho: tentativas, retentativas, throttling, falhas, circuito_aberto"""
+        with self._lock_contadores:
+            resumo = {}
+            for (caminho, evento), total in self._contadores.items():
+                resumo.setdefault(caminho, {})[evento] = total
+            return resumo
+
+    def _espera(self, tentativa, erro):
+        if erro.retry_after is not None:
+            return min(erro.retry_after, self.espera_maxima)
+        # Backoff exponencial com "full jitter"
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+
+    def _com_retentativas(self, caminho, requisicao):
+        for tentativa in range(self.max_tentativas):
+            if not self.circuito.permitir():
+                self._contar(caminho, 'circuito_aberto')
+                raise CircuitoAbertoError("Graph indisponível no momento; tente novamente em instantes")
+
+            self._contar(caminho, 'tentativas')
+            try:
+                resultado = requisicao()
+            except GraphError as e:
+                if e.status == 401 and self._invalidar_token and tentativa == 0:
+                    self._invalidar_token()
+                elif not e.retentavel:
+                    self._contar(caminho, 'falhas')
+                    raise
+
+                if tentativa == self.max_tentativas - 1:
+                    self._contar(caminho, 'falhas')
+                    # Uma falha no circuito por chamada esgotada; throttling com
+                    # Retry-After é o Graph pedindo calma, não indisponibilidade
+                    if e.retentavel and not (e.status == 429 and e.retry_after is not None):
+                        self.circuito.falha()
+                    raise
+                if e.status in (429, 503):
+                    self._contar(caminho, 'throttling')
+                self._contar(caminho, 'retentativas')
+                time.sleep(self._espera(tentativa, e))
+            else:
+                self.circuito.sucesso()
+                return resultado
+
+    def _get(self, url, **kwargs):
+        headers = {'Authorization': f'Bearer {self._token_provider()}'}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise GraphError(str(e), retentavel=True) from e
+        except requests.exceptions.RequestException as e:
+            raise GraphError(str(e)) from e
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            status = response.status_code
+            retry_after = _ler_retry_after(response.headers.get('Retry-After'))
+            response.close()
+            raise GraphError(str(e), status, retry_after, retentavel=status in STATUS_RETENTAVEIS) from e
+        return response
+
+    def get_metadata(self):
+        return self._com_retentativas(
+            'metadata', lambda: self._get(self.url_item, params={'$select': CAMPOS_METADATA}).json()
+        )
+
+    def download_content(self, tamanho=None, progresso=None):
+        """Baixa o arquivo em blocos para um arquivo temporário "spooled".
+
+        O conteúdo fica numa única cópia: em memória até ``LIMITE_DOWNLOAD_MEMORIA``
+        e em disco acima disso (``tamanho``, normalmente o ``size`` dos metadados,
+        permite ir direto para o disco). ``progresso(baixados, total)`` é chamado a
+        cada bloco; ``total`` é 0 quando o tamanho é desconhecido. Se a conexão cair
+        no meio do download ele recomeça do início.
+        """
+        return self._com_retentativas('content', lambda: self._baixar(tamanho, progresso))
+
+    def _baixar(self, tamanho, progresso):
+        response = self._get(f"{self.url_item}/content", stream=True)
+        total = int(response.headers.get('Content-Length') or 0) or int(tamanho or 0)
+
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_DOWNLOAD_MEMORIA)
+        if total > LIMITE_DOWNLOAD_MEMORIA:
+            arquivo.rollover()
+
+        baixados = 0
+        try:
+            with response:
+                for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                    arquivo.write(bloco)
+                    baixados += len(bloco)
+                    if progresso:
+                        progresso(baixados, total)
+        except requests.exceptions.RequestException as e:
+            arquivo.close()
+            raise GraphError(str(e), retentavel=True) from e
+
+        arquivo.seek(0)
+        return arquivo
+
+    def get_metadata_e_conteudo(self, progresso=None):
+        """Busca metadados e conteúdo ao mesmo tempo.
+
+        Retorna ``(metadata, conteudo)``. Os metadados são complementares: se só
+        eles falharem o retorno é ``(None, conteudo)``; uma falha no download do
+        conteúdo gera ``GraphError``. O download roda na thread que chamou, então
+        ``progresso`` pode atualizar a interface.
+        """
+        futuro_metadata = self._executor.submit(self.get_metadata)
+        conteudo = self.download_content(progresso=progresso)
+        try:
+            metadata = futuro_metadata.result()
+        except (GraphError, AuthError):
+            metadata = None
+        return metadata, conteudo
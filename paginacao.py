@@ -0,0 +1,68 @@
+"""Busca, ordenação e paginação da Tabela Geral feitas no servidor"""
+import numpy as np
+import pandas as pd
+
+
+def chave_ordenacao(serie):
+    """Posto de cada linha na ordenação crescente da coluna (vazios por último).
+
+    É calculada uma vez por coluna e versão da planilha (ver
+    ``DatasetStore.derivado``); ordenar um subconjunto de linhas passa a ser
+    só ordenar os postos dessas linhas.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # As categorias lidas da planilha já vêm em ordem; o código serve de posto
+        chave = serie.cat.codes.to_numpy().astype(np.float64)
+        chave[chave < 0] = np.inf
+        return chave
+    try:
+        postos = serie.rank(method='first', na_option='keep')
+    except TypeError:
+        # Colunas com tipos misturados (texto e número, data e texto) são ordenadas como texto
+        postos = serie.astype(str).where(serie.notna()).rank(method='first', na_option='keep')
+    chave = postos.to_numpy(dtype=np.float64, copy=True)
+    chave[np.isnan(chave)] = np.inf
+    return chave
+
+
+def ordenar(posicoes, chave, crescente=True):
+    """Reordena ``posicoes`` pelo posto das linhas; vazios ficam no fim nos dois sentidos"""
+    postos = chave[posicoes]
+    if not crescente:
+        postos = np.where(np.isinf(postos), np.inf, -postos)
+    return posicoes[np.argsort(postos, kind='stable')]
+
+
+def buscar(df, posicoes, termo):
+    """Linhas de ``posicoes`` com ``termo`` em alguma coluna de texto (sem diferenciar maiúsculas).
+
+    Colunas categóricas são comparadas pelas categorias (uma vez por valor
+    distinto) e depois pelos códigos das linhas; colunas de texto só nas
+    linhas já filtradas.
+    """
+    termo = termo.strip().lower()
+    if not termo:
+        return posicoes
+
+    encontradas = np.zeros(len(posicoes), dtype=bool)
+    for col in df.select_dtypes(include=['object', 'category']).columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias = serie.cat.categories.astype(str).str.lower()
+            codigos = np.flatnonzero(categorias.str.contains(termo, regex=False))
+            if len(codigos):
+                encontradas |= np.isin(serie.cat.codes.to_numpy()[posicoes], codigos)
+        else:
+            valores = serie.iloc[posicoes]
+            encontradas |= valores.notna().to_numpy() & valores.astype(str).str.lower().str.contains(
+                termo, regex=False
+            ).to_numpy()
+    return posicoes[encontradas]
+
+
+def pagina(posicoes, numero, tamanho):
+    """Posições da página ``numero`` (começando em 1) e o total de páginas"""
+    total_paginas = max(1, -(-len(posicoes) // tamanho))
+    numero = min(max(numero, 1), total_paginas)
+    inicio = (numero - 1) * tamanho
+    return posicoes[inicio:inicio + tamanho], total_paginas
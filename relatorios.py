@@ -0,0 +1,249 @@
+"""Relatórios exportados: PDF executivo (a partir do cubo de KPIs) e Excel.
+
+Não dependem do Streamlit: são usados pelos apps e pelo ``gerar_relatorios.py``.
+"""
+import io
+from datetime import datetime
+
+import pandas as pd
+from fpdf import FPDF
+from openpyxl import Workbook
+
+from esquema import resolver_colunas
+
+# Cores da Cocred em RGB (turquesa, verde escuro, roxo, cinza claro)
+TURQUESA = (0, 174, 157)
+VERDE_ESCURO = (0, 54, 65)
+ROXO = (73, 71, 157)
+CINZA_CLARO = (232, 236, 241)
+
+# Campanhas listadas na tabela de KPIs e no ranking
+MAX_CAMPANHAS_TABELA = 25
+TOP_CAMPANHAS = 5
+
+# Linhas convertidas por vez na exportação do Excel em streaming
+BLOCO_LINHAS_EXCEL = 5000
+
+# A partir de quantas linhas o Excel é gravado em streaming (workbook write-only)
+EXCEL_STREAMING_A_PARTIR_DE = 20000
+
+NOMES_FILTROS = {'ano': 'Ano', 'campanha': 'Campanha', 'meio': 'Meio', 'veiculo': 'Veículo'}
+
+
+def _texto(valor):
+    """As fontes padrão do PDF só têm caracteres latin-1; o resto vira '?'"""
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _cortar(valor, tamanho):
+    texto = _texto(valor)
+    return texto if len(texto) <= tamanho else texto[:tamanho - 3] + '...'
+
+
+def descrever_filtros(selecoes):
+    """'Ano: 2024 | Meio: TV' ou 'Todos os dados' quando não há filtro"""
+    partes = [f"{NOMES_FILTROS.get(nome, nome)}: {valor}" for nome, valor in selecoes.items() if valor is not None]
+    return ' | '.join(partes) if partes else 'Todos os dados'
+
+
+def pdf_em_bytes(pdf):
+    """Conteúdo do PDF direto em memória, sem arquivo temporário"""
+    saida = pdf.output(dest='S')
+    # fpdf 1.7 devolve str (latin-1); o fpdf2 devolve bytearray
+    return saida.encode('latin-1') if isinstance(saida, str) else bytes(saida)
+
+
+def _titulo_secao(pdf, titulo):
+    pdf.ln(4)
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_text_color(*TURQUESA)
+    pdf.cell(0, 8, _texto(titulo), 0, 1)
+    pdf.set_text_color(0, 0, 0)
+
+
+def _tabela(pdf, colunas, linhas):
+    """``colunas`` é uma lista de (título, largura, alinhamento)"""
+    pdf.set_font('Arial', 'B', 8)
+    pdf.set_fill_color(*VERDE_ESCURO)
+    pdf.set_text_color(255, 255, 255)
+    for titulo, largura, _ in colunas:
+        pdf.cell(largura, 7, _texto(titulo), 1, 0, 'C', 1)
+    pdf.ln()
+
+    pdf.set_font('Arial', '', 8)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_fill_color(*CINZA_CLARO)
+    for i, linha in enumerate(linhas):
+        for (_, largura, alinhamento), valor in zip(colunas, linha):
+            pdf.cell(largura, 6, _texto(valor), 1, 0, alinhamento, i % 2)
+        pdf.ln()
+
+
+def gerar_relatorio_executivo(cubo, selecoes, titulo='Relatório Cocred', progresso=None):
+    """PDF (bytes) com o resumo dos KPIs, a tabela por campanha e as melhores campanhas.
+
+    Todos os números vêm do ``CuboKPIs`` da versão da planilha, então o custo
+    não depende do número de linhas selecionadas. ``progresso(fracao, mensagem)``
+    é chamado a cada etapa.
+    """
+    if progresso:
+        progresso(0.1, "Calculando os KPIs...")
+    totais = cubo.totais(selecoes)
+    impacto, investimento, leads = totais['impacto'], totais['investimento'], totais['leads']
+    cpm = (investimento / impacto * 1000) if impacto > 0 else 0
+    cpl = (investimento / leads) if leads > 0 else 0
+    campanhas = cubo.por('campanha', selecoes)
+
+    if progresso:
+        progresso(0.4, "Montando o relatório...")
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+
+    # Título
+    pdf.set_fill_color(*TURQUESA)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font('Arial', 'B', 20)
+    pdf.cell(0, 20, _texto(titulo), 0, 1, 'C', 1)
+    pdf.ln(4)
+
+    pdf.set_text_color(*VERDE_ESCURO)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6, _texto(f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}'), 0, 1)
+    pdf.cell(0, 6, _texto(f'Filtros: {descrever_filtros(selecoes)}'), 0, 1)
+
+    # Big numbers
+    _titulo_secao(pdf, 'Resumo Geral')
+    _tabela(pdf, [
+        ('Registros', 30, 'R'), ('Impacto', 35, 'R'), ('Investimento', 40, 'R'),
+        ('CPM', 25, 'R'), ('Leads', 30, 'R'), ('CPL', 25, 'R'),
+    ], [[
+        f"{totais['registros']:,}", f"{impacto:,.0f}", f"R$ {investimento:,.2f}",
+        f"R$ {cpm:.2f}", f"{leads:,.0f}", f"R$ {cpl:.2f}",
+    ]])
+
+    if campanhas.empty:
+        if progresso:
+            progresso(0.9, "Gravando o PDF...")
+        return pdf_em_bytes(pdf)
+
+    # KPIs por campanha, das que mais investiram
+    por_investimento = campanhas.sort_values('investimento', ascending=False)
+    _titulo_secao(pdf, f'KPIs por Campanha ({len(campanhas)} campanhas)')
+    _tabela(pdf, [
+        ('Campanha', 55, 'L'), ('Impacto', 27, 'R'), ('Investimento', 33, 'R'),
+        ('CPM', 20, 'R'), ('Leads', 22, 'R'), ('CPL', 20, 'R'),
+    ], [
+        [_cortar(nome, 32), f"{linha.impacto:,.0f}", f"R$ {linha.investimento:,.2f}",
+         f"R$ {linha.cpm:.2f}", f"{linha.leads:,.0f}", f"R$ {linha.cpl:.2f}"]
+        for nome, linha in por_investimento.head(MAX_CAMPANHAS_TABELA).iterrows()
+    ])
+    if len(campanhas) > MAX_CAMPANHAS_TABELA:
+        pdf.set_font('Arial', 'I', 8)
+        pdf.cell(0, 6, _texto(f'Mostrando as {MAX_CAMPANHAS_TABELA} campanhas com maior investimento.'), 0, 1)
+
+    # Rankings
+    _titulo_secao(pdf, f'Top {TOP_CAMPANHAS} Campanhas')
+    com_leads = campanhas[campanhas['leads'] > 0]
+    rankings = [
+        ('Mais leads', campanhas.nlargest(TOP_CAMPANHAS, 'leads'), lambda l: f"{l.leads:,.0f} leads"),
+        ('Maior impacto', campanhas.nlargest(TOP_CAMPANHAS, 'impacto'), lambda l: f"{l.impacto:,.0f}"),
+        ('Menor CPL', com_leads.nsmallest(TOP_CAMPANHAS, 'cpl'), lambda l: f"R$ {l.cpl:.2f}"),
+    ]
+    for titulo_ranking, ranking, formatar in rankings:
+        pdf.set_font('Arial', 'B', 10)
+        pdf.set_text_color(*ROXO)
+        pdf.cell(0, 7, _texto(titulo_ranking), 0, 1)
+        pdf.set_font('Arial', '', 9)
+        pdf.set_text_color(0, 0, 0)
+        for posicao, (nome, linha) in enumerate(ranking.iterrows(), start=1):
+            pdf.cell(120, 6, _texto(f'{posicao}º {_cortar(nome, 60)}'), 0, 0)
+            pdf.cell(0, 6, _texto(formatar(linha)), 0, 1, 'R')
+
+    if progresso:
+        progresso(0.9, "Gravando o PDF...")
+    return pdf_em_bytes(pdf)
+
+
+def _linhas_excel(df, ao_gravar_bloco=None):
+    """Linhas do DataFrame como tuplas de valores Python, em blocos, com vazios como None.
+
+    ``ao_gravar_bloco(linhas)`` é chamada depois de cada bloco com o total de
+    linhas já entregues.
+    """
+    for inicio in range(0, len(df), BLOCO_LINHAS_EXCEL):
+        bloco = df.iloc[inicio:inicio + BLOCO_LINHAS_EXCEL].astype(object)
+        yield from bloco.where(bloco.notna(), None).itertuples(index=False, name=None)
+        if ao_gravar_bloco:
+            ao_gravar_bloco(inicio + len(bloco))
+
+
+def _escrever_aba(workbook, titulo, df, com_indice=False, ao_gravar_bloco=None):
+    aba = workbook.create_sheet(titulo)
+    if com_indice:
+        df = df.reset_index()
+        # describe() não tem nome no índice; pandas deixa a célula em branco
+        df.columns = ['' if str(col) == 'index' else col for col in df.columns]
+    aba.append([str(col) for col in df.columns])
+    for linha in _linhas_excel(df, ao_gravar_bloco):
+        aba.append(linha)
+
+
+def exportar_excel_completo(df, col_campanha=None, progresso=None,
+                            streaming_a_partir_de=EXCEL_STREAMING_A_PARTIR_DE):
+    """Exporta os dados, o resumo por campanha e as estatísticas para Excel (``BytesIO``)"""
+    if col_campanha is None:
+        col_campanha = resolver_colunas(df.columns)['campanha']
+
+    # Seleções grandes são gravadas linha a linha, sem montar a planilha inteira em memória
+    if len(df) >= streaming_a_partir_de:
+        return exportar_excel_streaming(df, col_campanha, progresso)
+
+    if progresso:
+        progresso(0.1, "Gravando a planilha...")
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Dados Brutos', index=False)
+
+        if col_campanha:
+            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+            # observed=True: a coluna de campanha é categórica e não deve listar campanhas fora do filtro
+            resumo = df.groupby(col_campanha, observed=True)[numeric_cols].sum()
+            resumo.to_excel(writer, sheet_name='Resumo por Campanha')
+
+        stats = df.describe()
+        stats.to_excel(writer, sheet_name='Estatísticas')
+
+    return output
+
+
+def exportar_excel_streaming(df, col_campanha=None, progresso=None):
+    """Mesmas abas do ``exportar_excel_completo``, escritas em streaming.
+
+    Usa um workbook ``write_only`` do openpyxl: cada linha é gravada assim que
+    é convertida, em blocos de ``BLOCO_LINHAS_EXCEL``, em vez de montar o modelo
+    de células da planilha inteira em memória. Os cabeçalhos saem sem a
+    formatação que o pandas aplica. Retorna um ``BytesIO``.
+
+    ``progresso(fracao, mensagem)``, se informada, é chamada a cada bloco
+    gravado (ver ``exportacoes.FilaExportacoes``).
+    """
+    def ao_gravar_bloco(linhas):
+        progresso(0.9 * linhas / len(df), f"Gravando linha {linhas:,} de {len(df):,}")
+
+    workbook = Workbook(write_only=True)
+    _escrever_aba(workbook, 'Dados Brutos', df, ao_gravar_bloco=ao_gravar_bloco if progresso else None)
+
+    if col_campanha:
+        numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+        resumo = df.groupby(col_campanha, observed=True)[numeric_cols].sum()
+        _escrever_aba(workbook, 'Resumo por Campanha', resumo, com_indice=True)
+
+    _escrever_aba(workbook, 'Estatísticas', df.describe(), com_indice=True)
+
+    if progresso:
+        progresso(0.95, "Compactando o arquivo...")
+    output = io.BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output
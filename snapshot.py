@@ -0,0 +1,96 @@
+"""Cópias locais em formato colunar (Feather) das planilhas já lidas"""
+import glob
+import hashlib
+import os
+import tempfile
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+def _resumo(*partes):
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:16]
+
+
+class SnapshotStore:
+    """Guarda em disco o DataFrame de cada versão da planilha.
+
+    Ler o snapshot (Feather sem compressão, mapeado em memória) leva
+    milissegundos, contra segundos do ``read_excel``; assim reinícios do app e
+    novas sessões só leem o Excel quando o SharePoint tem uma versão nova. As
+    chaves seguem o formato ``(drive_id, item_id, versao, ...)`` e só as
+    ``max_por_item`` versões mais recentes de cada item são mantidas.
+
+    Sem ``pyarrow`` instalado os métodos não fazem nada.
+    """
+
+    def __init__(self, diretorio, max_por_item=3):
+        self.diretorio = diretorio
+        self.max_por_item = max_por_item
+
+    @property
+    def disponivel(self):
+        return feather is not None
+
+    def _prefixo(self, drive_id, item_id):
+        return os.path.join(self.diretorio, _resumo(drive_id, item_id))
+
+    def _caminho(self, chave):
+        return f"{self._prefixo(*chave[:2])}_{_resumo(*chave[2:])}.feather"
+
+    def tem_item(self, drive_id, item_id):
+        """Indica se existe snapshot de alguma versão do item"""
+        return self.disponivel and bool(glob.glob(f"{self._prefixo(drive_id, item_id)}_*.feather"))
+
+    def carregar(self, chave):
+        """Retorna o DataFrame salvo para a versão, ou None"""
+        caminho = self._caminho(chave)
+        if not self.disponivel or not os.path.exists(caminho):
+            return None
+        try:
+            df = feather.read_table(caminho, memory_map=True).to_pandas()
+        except Exception:
+            # Snapshot corrompido ou de uma versão incompatível do pyarrow
+            self._remover(caminho)
+            return None
+        os.utime(caminho)
+        return df
+
+    def salvar(self, chave, df):
+        """Grava o snapshot da versão; retorna False se o DataFrame não puder ser salvo"""
+        if not self.disponivel:
+            return False
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(chave)
+
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        os.close(fd)
+        try:
+            # Sem compressão para que a leitura possa usar memory map diretamente
+            feather.write_feather(df.reset_index(drop=True), temporario, compression='uncompressed')
+            os.replace(temporario, caminho)
+        except Exception:
+            # Colunas com tipos misturados ou nomes não textuais não são suportados pelo Arrow
+            self._remover(temporario)
+            return False
+
+        self._limpar_antigos(*chave[:2])
+        return True
+
+    def _limpar_antigos(self, drive_id, item_id):
+        arquivos = sorted(
+            glob.glob(f"{self._prefixo(drive_id, item_id)}_*.feather"),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for caminho in arquivos[self.max_por_item:]:
+            self._remover(caminho)
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
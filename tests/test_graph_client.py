@@ -0,0 +1,201 @@
+"""GraphClient contra um servidor Graph falso local (retentativas, token, circuito e download)"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_client  # noqa: E402
+from graph_client import CircuitBreaker, CircuitoAbertoError, GraphClient, GraphError  # noqa: E402
+
+CONTEUDO = bytes(range(256)) * 4096  # 1 MB
+
+# As esperas do cliente são interceptadas nos testes; o tempo do circuito passa de verdade
+dormir = time.sleep
+
+
+class GraphFalso(BaseHTTPRequestHandler):
+    """Responde metadados e conteúdo; ``plano`` lista as respostas a dar antes das normais.
+
+    Cada item do plano é ``(status, cabecalhos)`` ou ``'cortar'``, que envia só
+    parte do conteúdo e fecha a conexão.
+    """
+    plano = []
+    requisicoes = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        GraphFalso.requisicoes.append((self.path, self.headers.get('Authorization')))
+        conteudo = self.path.split('?')[0].endswith('/content')
+        resposta = GraphFalso.plano.pop(0) if GraphFalso.plano else None
+
+        if resposta == 'cortar':
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(CONTEUDO)))
+            self.end_headers()
+            self.wfile.write(CONTEUDO[:len(CONTEUDO) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        if resposta is not None:
+            status, cabecalhos = resposta
+            self.send_response(status)
+            for nome, valor in cabecalhos.items():
+                self.send_header(nome, valor)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        corpo = CONTEUDO if conteudo else b'{"name": "campanhas.xlsx", "cTag": "c1"}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+@pytest.fixture
+def servidor():
+    GraphFalso.plano = []
+    GraphFalso.requisicoes = []
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), GraphFalso)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}/v1.0"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Esperas pedidas pelo cliente entre as tentativas (sem dormir de fato)"""
+    pedidas = []
+    monkeypatch.setattr(graph_client.time, 'sleep', pedidas.append)
+    return pedidas
+
+
+def criar_cliente(url, **kwargs):
+    kwargs.setdefault('circuito', CircuitBreaker(limite_falhas=2, tempo_aberto=0.2))
+    return GraphClient('drive', 'item', lambda: 'token', base_url=url, espera_base=0.5, **kwargs)
+
+
+def test_429_respeita_retry_after(servidor, esperas):
+    GraphFalso.plano = [(429, {'Retry-After': '7'})]
+    cliente = criar_cliente(servidor)
+
+    assert cliente.get_metadata()['cTag'] == 'c1'
+    assert esperas == [7.0]
+    assert cliente.estatisticas()['metadata'] == {'tentativas': 2, 'throttling': 1, 'retentativas': 1}
+
+
+def test_429_com_retry_after_nao_abre_o_circuito(servidor, esperas):
+    cliente = criar_cliente(servidor, max_tentativas=2)
+    for _ in range(3):
+        GraphFalso.plano = [(429, {'Retry-After': '1'})] * 2
+        with pytest.raises(GraphError) as erro:
+            cliente.get_metadata()
+        assert erro.value.status == 429
+
+    assert cliente.circuito.permitir()
+    assert cliente.get_metadata()['cTag'] == 'c1'
+
+
+def test_5xx_com_backoff_exponencial(servidor, esperas):
+    GraphFalso.plano = [(500, {}), (502, {}), (504, {})]
+    cliente = criar_cliente(servidor)
+
+    assert cliente.get_metadata()['cTag'] == 'c1'
+    # Full jitter: cada espera fica entre 0 e espera_base * 2 ** tentativa
+    assert len(esperas) == 3
+    assert all(0 <= espera <= 0.5 * 2 ** tentativa for tentativa, espera in enumerate(esperas))
+    assert cliente.estatisticas()['metadata'] == {'tentativas': 4, 'retentativas': 3}
+
+
+def test_401_renova_o_token_uma_unica_vez(servidor, esperas):
+    tokens = iter(['expirado', 'novo', 'outro'])
+    atual = [next(tokens)]
+    invalidacoes = []
+
+    def invalidar():
+        invalidacoes.append(1)
+        atual[0] = next(tokens)
+
+    GraphFalso.plano = [(401, {})]
+    cliente = GraphClient('drive', 'item', lambda: atual[0], invalidar_token=invalidar, base_url=servidor)
+    assert cliente.get_metadata()['cTag'] == 'c1'
+    assert [auth for _, auth in GraphFalso.requisicoes] == ['Bearer expirado', 'Bearer novo']
+
+    # Um segundo 401 seguido não renova de novo: a chamada falha
+    GraphFalso.plano = [(401, {}), (401, {})]
+    with pytest.raises(GraphError) as erro:
+        cliente.get_metadata()
+    assert erro.value.status == 401
+    assert len(invalidacoes) == 2
+    assert cliente.estatisticas()['metadata']['falhas'] == 1
+
+
+def test_circuito_abre_e_fica_meio_aberto(servidor, esperas):
+    cliente = criar_cliente(servidor, max_tentativas=2)
+
+    # Uma chamada esgotada conta uma falha, não uma por tentativa
+    GraphFalso.plano = [(500, {})] * 2
+    with pytest.raises(GraphError):
+        cliente.get_metadata()
+    assert cliente.circuito.permitir()
+
+    GraphFalso.plano = [(503, {})] * 2
+    with pytest.raises(GraphError):
+        cliente.get_metadata()
+    assert not cliente.circuito.permitir()
+
+    # Aberto: falha na hora, sem chegar ao servidor
+    feitas = len(GraphFalso.requisicoes)
+    with pytest.raises(CircuitoAbertoError):
+        cliente.get_metadata()
+    assert len(GraphFalso.requisicoes) == feitas
+
+    # Meio aberto: a chamada volta a ser tentada e uma nova falha reabre o circuito
+    dormir(0.25)
+    GraphFalso.plano = [(500, {})] * 2
+    with pytest.raises(GraphError):
+        cliente.get_metadata()
+    assert not cliente.circuito.permitir()
+
+    # O primeiro sucesso depois do tempo aberto fecha o circuito
+    dormir(0.25)
+    assert cliente.get_metadata()['cTag'] == 'c1'
+    assert cliente.circuito.permitir()
+    assert cliente.estatisticas()['metadata']['circuito_aberto'] == 1
+
+
+def test_download_recomeca_quando_a_conexao_cai(servidor, esperas):
+    GraphFalso.plano = ['cortar']
+    cliente = criar_cliente(servidor)
+    avanco = []
+
+    with cliente.download_content(progresso=lambda baixados, total: avanco.append((baixados, total))) as arquivo:
+        assert arquivo.read() == CONTEUDO
+
+    assert avanco[-1] == (len(CONTEUDO), len(CONTEUDO))
+    assert cliente.estatisticas()['content'] == {'tentativas': 2, 'retentativas': 1}
+
+
+def test_estatisticas_por_caminho(servidor, esperas):
+    GraphFalso.plano = [(404, {})]
+    cliente = criar_cliente(servidor)
+
+    with pytest.raises(GraphError):
+        cliente.get_metadata()
+    GraphFalso.plano = [(503, {'Retry-After': '2'})]
+    metadata, conteudo = cliente.get_metadata_e_conteudo()
+    conteudo.close()
+
+    estatisticas = cliente.estatisticas()
+    assert estatisticas['metadata']['tentativas'] + estatisticas['content']['tentativas'] == 4
+    assert estatisticas['metadata']['falhas'] == 1
+    assert sum(caminho.get('throttling', 0) for caminho in estatisticas.values()) == 1
+    assert sum(caminho.get('retentativas', 0) for caminho in estatisticas.values()) == 1